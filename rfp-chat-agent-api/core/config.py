@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import model_validator
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 from dotenv import load_dotenv
 
@@ -22,18 +22,39 @@ class Settings(BaseSettings):
     AZURE_OPENAI_DEPLOYMENT_NAME: str
     AZURE_OPENAI_API_VERSION: str
     AZURE_OPENAI_TEXT_EMBEDDING_DEPLOYMENT_NAME: str
+    # Global Batch deployment used when LLM_MODE is "batch"; defaults to AZURE_OPENAI_DEPLOYMENT_NAME
+    AZURE_OPENAI_BATCH_DEPLOYMENT_NAME: Optional[str] = None
+    # "sync" calls the LLM during the upload request, "batch" submits a Batch API job and returns with Status "pending"
+    LLM_MODE: str = "sync"
+    # Client-side limits for Azure OpenAI calls; set LLM_RPM and LLM_TPM to the deployment's quota, 0 disables them
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_RPM: int = 0
+    LLM_TPM: int = 0
     AZURE_STORAGE_CONNECTION_STRING: str
     AZURE_STORAGE_RFP_CONTAINER_NAME: str
+    BLOB_UPLOAD_CONCURRENCY: int = 8
     AZURE_DOCUMENTINTELLIGENCE_ENDPOINT: str
     AZURE_DOCUMENTINTELLIGENCE_API_KEY: str
-    PAGE_OVERLAP: int
+    # Chunks hold up to CHUNK_SIZE tokens and start with the last CHUNK_OVERLAP percent of CHUNK_SIZE of the previous chunk
+    CHUNK_SIZE: int = 1024
+    CHUNK_OVERLAP: int = 20
+    DOC_INTEL_PAGES_PER_REQUEST: int = 50
+    DOC_INTEL_PARALLEL_REQUESTS: int = 4
+    OCR_WORKERS: int = 4
+    TEXT_UPLOAD_WORKERS: int = 2
     AZURE_AI_SEARCH_SERVICE_ENDPOINT: str
     AZURE_AI_SEARCH_SERVICE_KEY: str
     AZURE_AI_SEARCH_INDEX_NAME: str
+    INDEX_CONCURRENCY: int = 4
+    INDEX_FILE_CONCURRENCY: int = 4
     COSMOS_DATABASE_NAME: str
     COSMOS_CONTAINER_NAME: str
     COSMOS_ENDPOINT: str
     
+    # Chat workflow
+    # Stop searching once review prompts reach this many tokens; 0 for no budget
+    CHAT_PROMPT_TOKEN_BUDGET: int = 0
+    
     # Optional logging settings
     LOG_LEVEL: str = "INFO"
     
@@ -0,0 +1,36 @@
+"""
+Logging setup for the application
+"""
+
+import logging
+from core.settings import settings
+
+# Packages whose loggers log at LOG_LEVEL; everything else, such as the Azure SDKs, logs warnings and above
+APP_LOGGERS = ("main", "routes", "services", "core")
+
+_configured = False
+
+def configure_logging():
+    """
+    Send log records to the console through a single handler on the root logger.
+    Safe to call more than once; only the first call has an effect.
+    """
+    global _configured
+
+    if _configured:
+        return
+
+    # Console handler (prints to terminal)
+    ch = logging.StreamHandler()
+    ch.setFormatter(logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    ))
+
+    root = logging.getLogger()
+    root.addHandler(ch)
+    root.setLevel(logging.WARNING)
+
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(settings.LOG_LEVEL)
+
+    _configured = True
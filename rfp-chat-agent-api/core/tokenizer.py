@@ -0,0 +1,14 @@
+"""
+Shared tiktoken encoder for token counting
+"""
+
+# Loading the BPE tables is expensive, so the encoder is created on first use and shared by every caller
+_ENC = None
+
+def get_enc():
+    global _ENC
+    if _ENC is None:
+        # Imported here so processes that never count tokens do not pay for tiktoken at startup
+        import tiktoken
+        _ENC = tiktoken.get_encoding("o200k_base")
+    return _ENC
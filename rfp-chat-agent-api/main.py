@@ -1,14 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import ORJSONResponse
 from routes import chat
 from core.config import settings
+from core.logging import configure_logging
+from services.rfp_service import RfpService
+from services.service_registry import close_services, warmup_services
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+
+    # Create the Azure service clients before the first request arrives
+    await asyncio.to_thread(warmup_services)
+
+    # Decision log batches submitted before a restart are polled again
+    await RfpService().resume_decision_log_batches()
+    yield
+    await close_services()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="RFP Chat API powered by Azure OpenAI.",
     version="1.0.0",
-    docs_url="/swagger"
+    docs_url="/swagger",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,7 +1,9 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from models.decision_log import DecisionLog
 
 class ProcessRfpResponse(BaseModel):
     Pursuit_Name: str
-    Decision_Log: Optional[DecisionLog] = None
\ No newline at end of file
+    Decision_Log: Optional[DecisionLog] = None
+    # "pending" when the decision log is being generated by a batch job and will be stored as metadata once it completes
+    Status: Literal["completed", "pending"] = "completed"
\ No newline at end of file
@@ -8,6 +8,9 @@ class SearchPromptResponse(BaseModel):
     search_query: str
     #filter: str | None
 
+# Consecutive attempts without new vetted results after which the search stops early
+NO_PROGRESS_ATTEMPTS = 2
+
 @dataclass
 class RfpConversation:
     user_query: str
@@ -16,6 +19,7 @@ class RfpConversation:
     max_attempts: int = 3,
     user_id: Optional[str] = None
     session_id: Optional[str] = None
+    prompt_token_budget: int = 0  # 0 for no budget
     
     # State maintained while processing the agent rag workflow
     attempts: int = field(default=0)
@@ -28,9 +32,26 @@ class RfpConversation:
     thought_process: List[dict] = field(default_factory=list)
     reviews: List[str] = field(default_factory=list)      # Thought processes from reviews
     decisions: List[str] = field(default_factory=list)    # Store the actual decisions
+    attempts_without_progress: int = field(default=0)     # Consecutive attempts that vetted no new results
+    prompt_tokens: int = field(default=0)                 # Estimated review prompt tokens sent so far
     
     def should_continue(self) -> bool:
-        return self.attempts < self.max_attempts and not self.has_sufficient_results()
+        return (
+            self.attempts < self.max_attempts
+            and not self.has_sufficient_results()
+            and not self.is_stalled()
+            and not self.is_over_budget()
+        )
+
+    def is_stalled(self) -> bool:
+        # Searches exclude processed chunks, so repeated attempts without new vetted results are unlikely to find any
+        return self.attempts_without_progress >= NO_PROGRESS_ATTEMPTS
+
+    def is_over_budget(self) -> bool:
+        return self.prompt_token_budget > 0 and self.prompt_tokens >= self.prompt_token_budget
+
+    def record_progress(self, new_vetted_results: int):
+        self.attempts_without_progress = 0 if new_vetted_results else self.attempts_without_progress + 1
     
     def has_sufficient_results(self) -> bool:
         return "finalize" in self.decisions
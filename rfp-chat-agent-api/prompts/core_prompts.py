@@ -71,6 +71,44 @@ SEARCH_PROMPT = """Generate a search query based on the user's question and what
     Assistant: 
     search_query: "contract terms conditions service level agreement SLA performance metrics duration length termination"
 
+    ###Query Writing Guidelines###
+
+    - Write the query in the language of the documents, not the language of the question. Questions are phrased the way a proposal team talks; the documents are phrased the way a procurement team writes. Prefer the formal terms a document would use over informal words from the question.
+    - Include synonyms and alternative phrasings for the key concept. Different documents describe the same thing with different words, and the search matches the wording of the document text.
+    - Include the section headings, defined terms and standard phrases under which the information is usually found, since the heading is often part of the same chunk as the details.
+    - Keep every keyword in the query related to the question. Unrelated terms pull in results about other topics and push the relevant results out of the top results.
+    - Do not include words that appear in almost every section of an RFP, such as the client's name, "proposal" or "RFP", unless they are part of a phrase that identifies the information.
+    - Keep names, numbers, dates, acronyms and quoted phrases from the question exactly as the user wrote them, and add the spelled-out form of an acronym when it is a common one.
+    - When the question asks about several things at once, cover the part that has not been found yet rather than trying to cover every part in one query.
+    - When the question is general, describe the kinds of sections that would answer it. When the question is specific, describe the sentence that would answer it, including the kind of value it would contain, such as a date, an amount, a count or a duration.
+    - When the question refers to an earlier question or answer in the conversation, resolve what it refers to and search for that topic explicitly instead of repeating words such as "it", "that" or "the same".
+    - Do not include instructions, filters, quotation marks around the whole query, or explanations in the search query. Return only the text that should be searched.
+    - Aim for a query of roughly ten to thirty words. A query that is too short misses documents that use other wording, and a query that is too long dilutes the terms that matter most.
+    - Put the most important terms first and do not repeat the same term several times; repetition does not make a term more important to the search.
+
+    ###Using Previous Attempts###
+
+    When previous attempts are provided, do not repeat a query that has already been tried. Read each review to learn which information was found and which is still missing, then target the missing information with different wording.
+    If a review says the results were about the wrong topic, move away from the keywords used in that attempt. If a review says the results were relevant but incomplete, keep the topic and add terms that describe the missing details.
+    If a review says a related topic was found instead of the one asked about, add the terms that distinguish the two and leave out the terms they share.
+    If several attempts have already been made, try a different angle on the question, such as the section where the information would be defined, an appendix or schedule that would list it, or the obligations and conditions that would depend on it.
+
+    User Question: "What is the submission deadline for this RFP?"
+    ### Previous Search Attempts ###
+    <Attempt 1>
+       search_query: "submission deadline due date submit proposals by closing date proposal due"
+       review: The results describe the questions period and the date questions must be submitted, but not the closing date for proposals. We are missing the proposal closing date and time.
+    Assistant: 
+    search_query: "closing date and time proposals must be received no later than local time late proposals will not be accepted RFP closing"
+
+    User Question: "How will proposals be evaluated?"
+    ### Previous Search Attempts ###
+    <Attempt 1>
+       search_query: "evaluation criteria scoring methodology points weights technical score price score vendor qualifications assessment selection process"
+       review: Result 0 lists the rated technical criteria and their points. The price evaluation and the minimum pass mark are not covered.
+    Assistant: 
+    search_query: "financial evaluation pricing score lowest price formula minimum technical threshold pass mark mandatory requirements pass fail"
+
     """
 
 SEARCH_REVIEW_PROMPT = """Review these search results and determine which contain relevant information to answering the user's question.
@@ -98,4 +136,176 @@ SEARCH_REVIEW_PROMPT = """Review these search results and determine which contai
    For General Questions:
    If the user asks a general question, consider all chunks with semi-relevant information to be valid. Our goal is to compile a comprehensive answer to the user's question.
    Consider making multiple attempts for these type of questions even if we find valid chunks on the first pass. We want to try to gather as much information as possible and form a comprehensive answer.
-   """
\ No newline at end of file
+
+   Index Rules:
+   - Every index in the current search results must appear in exactly one of valid_results or invalid_results.
+   - Only use indices of the current search results. Never use an index that is not shown in the current search results.
+   - Never include previously vetted results in valid_results or invalid_results; they have already been reviewed.
+   - If there are no current search results, return empty lists and decide whether another search could help.
+
+   Deciding Between "retry" and "finalize":
+   - Choose "finalize" when the valid results from this review together with the previously vetted results answer the question.
+   - Choose "retry" when important parts of the question are still unanswered and a different search is likely to find them.
+   - Choose "finalize" when previous attempts have already searched for the missing information with different wording and found nothing; further searching is unlikely to help.
+   - When choosing "retry", the thought_process must describe what is missing so the next search query can target it.
+
+   ###Examples###
+
+   User Question: "What is the submission deadline for this RFP?"
+   Current Search Results:
+      Result #0: "Proposals must be received no later than 2:00 p.m. Eastern Time on March 14, 2025. Late proposals will not be accepted."
+      Result #1: "The Province may, at its sole discretion, amend this RFP by issuing an addendum."
+      Result #2: "Questions regarding this RFP must be submitted by February 28, 2025."
+   Previously Vetted Results: None
+   Previous Attempts: None
+
+   Response:
+      thought_process: This is a specific question about the proposal deadline. Result 0 states the closing date and time, which fully answers the question. Result 2 is the deadline for questions, not proposals, and result 1 is about addenda. We have enough information and will answer.
+      valid_results: [0]
+      invalid_results: [1, 2]
+      decision: "finalize"
+
+   User Question: "What are the vendor's responsibilities under this contract?"
+   Current Search Results:
+      Result #0: "The Contractor shall provide a contact centre operating Monday to Friday from 8:00 a.m. to 8:00 p.m."
+      Result #1: "The Contractor shall maintain all records in accordance with the Province's retention schedule."
+      Result #2: "Proponents must include three client references."
+   Previously Vetted Results: None
+   Previous Attempts: None
+
+   Response:
+      thought_process: This is a general question about the scope of work. Results 0 and 1 each describe an obligation of the contractor and are valid. Result 2 is a proposal submission requirement, not a contract responsibility. Because this is a general question, the results so far likely cover only part of the scope; we are missing reporting, staffing and transition obligations. We will keep looking.
+      valid_results: [0, 1]
+      invalid_results: [2]
+      decision: "retry"
+
+   User Question: "How many FTEs will this contract require?"
+   Current Search Results:
+      Result #0: "The Contractor shall provide sufficient staff to meet the service levels in Schedule B."
+      Result #1: "Proponents must describe their approach to recruiting and training staff."
+   Previously Vetted Results: None
+   Previous Attempts:
+      Attempt 1: "full-time equivalent FTE staffing levels number of resources team size" - no result stated a number of FTEs.
+
+   Response:
+      thought_process: This is a specific question asking for a number. Neither result states an FTE count; result 0 only says staffing must meet the service levels and result 1 is a proposal requirement. Both attempts searched for staffing numbers with different wording and found none, so the RFP likely does not specify an FTE count. We will answer and explain that no count was found.
+      valid_results: []
+      invalid_results: [0, 1]
+      decision: "finalize"
+   """
+
+FINAL_ANSWER_PROMPT = """Create a comprehensive answer to the user's question using the vetted results.
+
+   Your input will contain the following information:
+
+   1. User Question: The question the user asked
+   2. Vetted Results: Search results from the RFP documents that were reviewed and found relevant to the question. Each result has an ID, a pursuit name, a source file and its content.
+
+   The conversation history that follows the input contains the previous questions and answers in this session. Use it to understand follow-up questions, but only state facts that are supported by the vetted results.
+
+   Your task:
+   1. Read every vetted result and identify the information that answers the user's question
+   2. Synthesize these results into a clear, complete answer. Combine information from several results when they cover different parts of the question
+   3. If the vetted results only partially answer the question, answer what you can and state clearly which parts could not be found in the RFP documents
+   4. If there were no vetted results, say you couldn't find any relevant information to answer the question
+
+   ###Formatting Guidance###
+
+   - Always use valid markdown syntax. Try to use level 1 or level 2 headers for your sections.
+   - Use bullet points or numbered lists for requirements, criteria, deliverables and other enumerations.
+   - Use a markdown table when comparing several items that share the same attributes, such as evaluation criteria and their weights.
+   - Keep dates, times, amounts, percentages and durations exactly as they appear in the vetted results. Do not convert currencies or time zones.
+   - Quote short passages verbatim when the exact wording matters, for example mandatory requirements or contractual obligations.
+   - Be detailed. We are trying to construct thorough responses for proposal teams, so more relevant detail is better than brevity.
+
+   ###Citation Guidance###
+
+   - Cite your sources using the following format: some text <cit>pursuit name - chunk id</cit> , some more text <cit>pursuit name - chunk id</cit> , etc.
+   - Place the citation directly after the sentence or bullet point that uses the information.
+   - Only cite sources that are actually used in the answer.
+   - Never invent a chunk id. Only use the IDs and pursuit names shown in the vetted results.
+   - When a statement is supported by more than one result, cite each of them.
+
+   ###Accuracy Guidance###
+
+   - Do not add information that is not contained in the vetted results, even if it is commonly true for RFPs.
+   - If two results contradict each other, for example an original date and an amended date from an addendum, present both and cite each one.
+   - If the question asks for a yes or no answer, start with the answer and then explain the supporting details.
+   - If the user asks about a specific pursuit and a result belongs to a different pursuit, do not use that result.
+   - If the user asks a follow-up question, answer the follow-up directly instead of repeating the previous answer from the conversation history.
+   - Do not speculate about the client's intentions, the likelihood of winning the pursuit, or pricing strategy unless the vetted results discuss them.
+
+   ###Structure Guidance###
+
+   - Start with a short direct answer to the question in one or two sentences, then give the supporting details under headers.
+   - Group related details together, for example all requirements of one kind under one header, instead of listing them in the order the results happened to be returned.
+   - When the results come from more than one pursuit, answer for each pursuit under its own header so the details are not mixed up.
+   - When a requirement has conditions, exceptions or deadlines attached, keep them next to the requirement they apply to.
+   - End with the parts of the question that could not be answered from the vetted results, if any, and suggest which sections of the RFP documents might contain them.
+   - Do not add a closing summary that repeats the answer, and do not describe the search process in the answer.
+
+   ###Example###
+
+   User Question: "What is the submission deadline for this RFP?"
+   Vetted Results:
+      ID: 3f1c, Pursuit Name: Contact Centre Services, Content: "Proposals must be received no later than 2:00 p.m. Eastern Time on March 14, 2025. Late proposals will not be accepted."
+      ID: 9a7e, Pursuit Name: Contact Centre Services, Content: "Addendum 2: The RFP closing date is extended to March 21, 2025 at 2:00 p.m. Eastern Time."
+
+   Answer:
+      # Submission Deadline
+
+      Proposals are due by **2:00 p.m. Eastern Time on March 21, 2025** <cit>Contact Centre Services - 9a7e</cit>.
+
+      ## Details
+      - The original closing date was March 14, 2025 at 2:00 p.m. Eastern Time <cit>Contact Centre Services - 3f1c</cit>.
+      - Addendum 2 extended the closing date by one week <cit>Contact Centre Services - 9a7e</cit>.
+      - Late proposals will not be accepted <cit>Contact Centre Services - 3f1c</cit>.
+
+   User Question: "What insurance coverage do we need, and do we need a performance bond?"
+   Vetted Results:
+      ID: 51d0, Pursuit Name: Benefits Administration, Content: "The Contractor shall maintain commercial general liability insurance of not less than $5,000,000 per occurrence and professional liability insurance of not less than $2,000,000 per claim."
+      ID: 7b22, Pursuit Name: Benefits Administration, Content: "Certificates of insurance must be provided within ten (10) business days of contract award."
+
+   Answer:
+      # Insurance Requirements
+
+      The contractor must carry the following coverage <cit>Benefits Administration - 51d0</cit>:
+
+      | Coverage | Minimum Limit |
+      | --- | --- |
+      | Commercial general liability | $5,000,000 per occurrence |
+      | Professional liability | $2,000,000 per claim |
+
+      Certificates of insurance must be provided within ten (10) business days of contract award <cit>Benefits Administration - 7b22</cit>.
+
+      ## Performance Bond
+      The vetted results do not mention a performance bond, so I couldn't confirm whether one is required. Consider checking the financial security or bonding sections of the RFP.
+   """
+
+# User input templates for the review and final answer calls, filled with str.format_map.
+# Only the placeholders vary between requests, so the surrounding text is byte-identical every time.
+SEARCH_REVIEW_INPUT_TEMPLATE = """
+                User Question: {user_query}
+
+                <Current Search Results to review>
+                {current_results}
+                <end current search results to review>
+
+                <previously vetted results, do not review>
+                {vetted_results}
+                <end previously vetted results, do not review>
+
+                <Previous Attempts>
+                {search_history}
+                <end Previous Attempts>
+                """
+
+FINAL_ANSWER_INPUT_TEMPLATE = """User Question: {user_query}
+
+                Vetted Results:
+                {vetted_results}"""
+
+# Azure OpenAI only caches prompts whose first 1024 tokens are identical across requests.
+# The static system prompts used on every chat request must stay above that size so the
+# request prefix is served from the prompt cache; tests/test_core_prompts.py checks this.
+PROMPT_CACHE_MIN_TOKENS = 1024
@@ -1,29 +1,16 @@
 from typing_extensions import Annotated
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
 from typing import Dict, Any, Optional
 from services.rfp_service import RfpService
 from models.process_rfp_response import ProcessRfpResponse
 import logging
+import orjson
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Console handler (prints to terminal)
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
-
-# Formatter
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-
-ch.setFormatter(formatter)
-
-# Add handler
-logger.addHandler(ch)
 
 @router.post("/rfp/chat")
 async def chat_with_rfp(
@@ -33,13 +20,30 @@ async def chat_with_rfp(
     pursuit_name: Annotated[Optional[str], Form()] = None
 ):
     try:
-        logger.info(f"Received chat request for RFP pursuit: {pursuit_name} with question: {question}")
+        logger.debug("Received chat request for RFP pursuit: %s with question: %s", pursuit_name, question)
         search_response = await RfpService().chat_with_rfp(question, pursuit_name, session_id, user_id)
     except ValidationError as e:
         logger.error(f"Validation error: {e}")
         return {"error": str(e)}
     return search_response
 
+@router.post("/rfp/chat/stream")
+async def chat_with_rfp_stream(
+    session_id: Annotated[str, Form(...)],
+    user_id: Annotated[str, Form(...)],
+    question: Annotated[str, Form(...)],
+    pursuit_name: Annotated[Optional[str], Form()] = None
+):
+    """Stream the answer as server-sent events: a data event per answer delta, then a done event"""
+    logger.debug("Received streaming chat request for RFP pursuit: %s with question: %s", pursuit_name, question)
+
+    async def event_stream():
+        async for chunk in RfpService().chat_with_rfp_stream(question, pursuit_name, session_id, user_id):
+            yield f"data: {orjson.dumps({'delta': chunk}).decode()}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.post("/rfp/upload", response_model=ProcessRfpResponse)
 async def upload_rfp(
     pursuit_name: Annotated[str, Form(...)] ,
@@ -1,4 +1,6 @@
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from azure.search.documents.indexes.models import SearchIndex, SearchField, VectorSearch, VectorSearchProfile, HnswAlgorithmConfiguration, SemanticSearch, SemanticConfiguration, SemanticPrioritizedFields, SemanticField, AzureOpenAIVectorizer, AzureOpenAIVectorizerParameters
 from azure.search.documents.indexes import SearchIndexClient
 from azure.core.credentials import AzureKeyCredential 
@@ -25,23 +27,17 @@ from core.settings import settings
 
 NUM_SEARCH_RESULTS = 5
 K_NEAREST_NEIGHBORS = 30
+INDEX_BATCH_SIZE = 100  # Documents per upload request; Azure AI Search accepts up to 1000
+QUERY_EMBEDDING_CACHE_SIZE = 256  # Each cached embedding holds 3072 floats, so keep the cache small
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
-# Console handler (prints to terminal)
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+@lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+def _embed_query(query: str) -> List[float]:
+    """Embed a search query, reusing the embedding when the same query is searched again"""
+    from services.service_registry import get_azure_openai_service
 
-# Formatter
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-
-ch.setFormatter(formatter)
-
-# Add handler
-logger.addHandler(ch)
+    return get_azure_openai_service().create_embedding(query)
 
 # Type Definitions
 class SearchResult(BaseModel):
@@ -123,17 +119,61 @@ class AzureAISearchService:
         result = self.search_index_client.create_or_update_index(idx)
         return result.name
     
-    def index_rfp_chunks(self, pursuit_name: str, rfp_id: str, chunks: List[str], page_number: List[str], file_name: str) -> List[str]:
-        """Embed each chunk and upload to vector index."""
+    def index_rfp_chunks(
+            self,
+            pursuit_name: str,
+            rfp_id: str,
+            chunks: List[str],
+            page_number: List[str],
+            file_name: str,
+            max_concurrency: int = 1
+        ) -> List[str]:
+        """
+        Embed each chunk and upload to vector index.
+
+        Chunks are embedded and uploaded in batches of INDEX_BATCH_SIZE, with up to max_concurrency batches in flight.
+        """
+        pages = [page_number[idx] if idx < len(page_number) else None for idx in range(len(chunks))]
+        batches = [
+            (chunks[start:start + INDEX_BATCH_SIZE], pages[start:start + INDEX_BATCH_SIZE])
+            for start in range(0, len(chunks), INDEX_BATCH_SIZE)
+        ]
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            results = list(executor.map(
+                lambda batch: self._index_batch(pursuit_name, rfp_id, batch[0], batch[1], file_name),
+                batches
+            ))
+
+        uploaded = [key for batch_uploaded, _ in results for key in batch_uploaded]
+        failed = [key for _, batch_failed in results for key in batch_failed]
+
+        if failed:
+            logger.error(f"Failed to upload chunks: {failed}")
+        else:
+            logger.info("Successfully uploaded %d chunks.", len(uploaded))
+        
+        return uploaded
+
+    def _index_batch(
+            self,
+            pursuit_name: str,
+            rfp_id: str,
+            chunks: List[str],
+            pages: list,
+            file_name: str
+        ) -> tuple[List[str], List[str]]:
+        """Embed and upload one batch of chunks, returning the uploaded and failed chunk IDs."""
         from services.service_registry import get_azure_openai_service
 
         documents = []
 
-        for idx, chunk in enumerate(chunks):
-            embedding = get_azure_openai_service().create_embedding(chunk)
+        # Embed the whole batch in a few requests rather than one round trip per chunk
+        embeddings = get_azure_openai_service().create_embeddings(chunks) if chunks else []
+
+        for chunk, page, embedding in zip(chunks, pages, embeddings):
             chunk_id = str(uuid.uuid4())
-            logger.info(f"Generated chunk ID: {chunk_id} for pursuit: {pursuit_name} Chunk content: {chunk[:50]}...")
-            page = page_number[idx] if idx < len(page_number) else None
+            logger.debug("Generated chunk ID: %s for pursuit: %s Chunk content: %.50s...", chunk_id, pursuit_name, chunk)
 
             documents.append({
                 "chunk_id": chunk_id,
@@ -144,19 +184,29 @@ class AzureAISearchService:
                 "chunk_content": chunk,
                 "chunk_content_vector": embedding  # this must match the Collection(Edm.Single) field
             })
-            logger.info(f"Prepared document for pursuit: {pursuit_name} file: {file_name} chunk: {chunk_id}")
+            logger.debug("Prepared document for pursuit: %s file: %s chunk: %s", pursuit_name, file_name, chunk_id)
+
+        if not documents:
+            return [], []
 
         result = self.search_client.upload_documents(documents=documents)
         uploaded = [str(r.key) for r in result if r.succeeded]
         failed = [str(r.key) for r in result if not r.succeeded]
 
-        if failed:
-            logger.error(f"Failed to upload chunks: {failed}")
-        else:
-            logger.info(f"Successfully uploaded {len(uploaded)} chunks.")
-        
-        return uploaded
+        return uploaded, failed
     
+    def delete_rfp_chunks(self, rfp_id: str) -> int:
+        """Delete every chunk indexed under an RFP ID, returning how many were deleted."""
+        results = self.search_client.search(search_text="*", filter=f"rfp_id eq '{rfp_id}'", select=["chunk_id"])
+        chunk_ids = [result["chunk_id"] for result in results]
+
+        for start in range(0, len(chunk_ids), INDEX_BATCH_SIZE):
+            self.search_client.delete_documents(
+                documents=[{"chunk_id": chunk_id} for chunk_id in chunk_ids[start:start + INDEX_BATCH_SIZE]]
+            )
+
+        return len(chunk_ids)
+
     def run_search(
             self,
             search_query: str,
@@ -166,9 +216,7 @@ class AzureAISearchService:
         """
         Perform a hybrid search with semantic reranking using Azure Search with both semantic and vector queries.
         """
-        from services.service_registry import get_azure_openai_service
-
-        query_vector = get_azure_openai_service().create_embedding(search_query)
+        query_vector = _embed_query(search_query)
         vector_query = VectorizedQuery(
             vector=query_vector,
             k_nearest_neighbors=K_NEAREST_NEIGHBORS,
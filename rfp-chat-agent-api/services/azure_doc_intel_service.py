@@ -1,7 +1,17 @@
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
+from azure.core.exceptions import HttpResponseError
+from azure.ai.documentintelligence.aio import DocumentIntelligenceClient as AsyncDocumentIntelligenceClient
 from azure.ai.documentintelligence.models import AnalyzeDocumentRequest
 from core.settings import settings
+from collections.abc import Mapping
+import asyncio
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Sections and figures refer to other elements of the result by collection and index, e.g. "/paragraphs/3"
+_ELEMENT_REFERENCE = re.compile(r"/(\w+)/(\d+)")
 
 class AzureDocIntelService:
     def __init__(self):
@@ -11,14 +21,137 @@ class AzureDocIntelService:
         ]):
             raise ValueError("Required Azure Document Intelligence settings are missing")
 
-        self.document_intelligence_client = DocumentIntelligenceClient(
+        self.async_document_intelligence_client = AsyncDocumentIntelligenceClient(
             endpoint=settings.AZURE_DOCUMENTINTELLIGENCE_ENDPOINT, credential=AzureKeyCredential(settings.AZURE_DOCUMENTINTELLIGENCE_API_KEY)
         )
 
-    def extract_text_from_url(self, url: str):
-        poller = self.document_intelligence_client.begin_analyze_document(
-            "prebuilt-layout", AnalyzeDocumentRequest(url_source=url)
+    async def close(self):
+        await self.async_document_intelligence_client.close()
+
+    async def extract_text_from_url_async(self, url: str):
+        """
+        Analyze the document at the given URL.
+
+        Large documents are analyzed as several page ranges in parallel and the results are
+        stitched back together, so the returned result matches a single full analysis.
+        """
+        pages_per_request = settings.DOC_INTEL_PAGES_PER_REQUEST
+
+        if pages_per_request <= 0:
+            return await self.analyze_async(url)
+
+        # Most documents fit in the first page range, which then costs a single request
+        try:
+            results = [await self.analyze_async(url, f"1-{pages_per_request}")]
+        except HttpResponseError as e:
+            if not self._is_bad_request(e):
+                raise
+            # Page ranges are not supported for every file type, so analyze the whole document as before
+            logger.info("Page range rejected, analyzing the whole document in one request: %s", e)
+            return await self.analyze_async(url)
+
+        next_page = pages_per_request + 1
+        more_pages = len(results[0].pages or []) == pages_per_request
+
+        while more_pages:
+            # The result does not report the document's page count, so analyze the next ranges concurrently
+            # until one comes back short
+            ranges = []
+            for i in range(settings.DOC_INTEL_PARALLEL_REQUESTS):
+                first_page = next_page + i * pages_per_request
+                ranges.append(f"{first_page}-{first_page + pages_per_request - 1}")
+
+            outcomes = await asyncio.gather(*[self.analyze_async(url, pages) for pages in ranges], return_exceptions=True)
+
+            for outcome in outcomes:
+                if isinstance(outcome, HttpResponseError) and self._is_bad_request(outcome):
+                    # The first range of this document was accepted, so a later range can only be rejected for
+                    # starting past the last page. The service rejects it before analyzing anything
+                    logger.debug("Page range starts past the end of the document: %s", outcome)
+                    more_pages = False
+                    break
+
+                # Anything else, such as throttling or a service error the SDK gave up retrying, fails the document
+                # rather than silently truncating it
+                if isinstance(outcome, BaseException):
+                    raise outcome
+
+                if outcome.pages:
+                    results.append(outcome)
+
+                if len(outcome.pages or []) < pages_per_request:
+                    more_pages = False
+                    break
+
+            next_page += len(ranges) * pages_per_request
+
+        return self.merge_results(results)
+
+    async def analyze_async(self, url: str, pages: str | None = None):
+        poller = await self.async_document_intelligence_client.begin_analyze_document(
+            "prebuilt-layout", AnalyzeDocumentRequest(url_source=url), pages=pages
         )
-        
-        result = poller.result()
-        return result
\ No newline at end of file
+        return await poller.result()
+
+    @staticmethod
+    def _is_bad_request(error: HttpResponseError) -> bool:
+        """Whether the service rejected the request itself, such as its pages parameter, rather than failing to run it"""
+        return error.status_code == 400
+
+    @staticmethod
+    def merge_results(results: list):
+        """
+        Merge page range results into the first result. The content is joined, every span is shifted to match
+        the joined content, list collections such as pages, paragraphs, tables and sections are concatenated,
+        and element references such as "/paragraphs/3" are renumbered to the merged collections.
+        """
+        merged = results[0]
+
+        if len(results) == 1:
+            return merged
+
+        content_parts = [merged["content"]]
+        offset = len(merged["content"]) + 1
+
+        for result in results[1:]:
+            # Where each of this result's collections starts once appended to the merged result
+            index_offsets = {key: len(merged.get(key) or []) for key, value in result.items() if isinstance(value, list)}
+            _shift_references(result, offset, index_offsets)
+
+            for key in index_offsets:
+                merged[key] = list(merged.get(key) or []) + list(result[key])
+
+            content_parts.append(result["content"])
+            offset += len(result["content"]) + 1
+
+        merged["content"] = "\n".join(content_parts)
+        return merged
+
+def _shift_references(node, offset: int, index_offsets: dict[str, int]):
+    """Shift every span under node by offset and renumber element references by index_offsets, in place"""
+    if isinstance(node, list):
+        for item in node:
+            _shift_references(item, offset, index_offsets)
+        return
+
+    if not isinstance(node, Mapping):
+        return
+
+    for key, value in list(node.items()):
+        if key == "span" and value:
+            value["offset"] += offset
+        elif key == "spans" and value:
+            for span in value:
+                span["offset"] += offset
+        elif key == "elements" and value:
+            node[key] = [_renumber_element(element, index_offsets) for element in value]
+        else:
+            _shift_references(value, offset, index_offsets)
+
+def _renumber_element(element: str, index_offsets: dict[str, int]) -> str:
+    match = _ELEMENT_REFERENCE.fullmatch(element)
+    if not match:
+        return element
+
+    collection, index = match.groups()
+    return f"/{collection}/{int(index) + index_offsets.get(collection, 0)}"
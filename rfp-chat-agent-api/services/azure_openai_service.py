@@ -1,9 +1,19 @@
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI, AzureOpenAI
 from prompts.core_prompts import RFP_INGESTION_SYSTEM_PROMPT
 from core.settings import settings
 from models.decision_log import DecisionLog
+from services.rate_limiter import TokenBucket
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
 import json
-from typing import List, Dict, Generator
+import threading
+from typing import AsyncGenerator, List, Dict, Generator
+
+# Rough token estimate used for rate limiting, so requests can be throttled without tokenizing them
+CHARS_PER_TOKEN = 4
+
+# Texts per embeddings request; the endpoint accepts a list of inputs, so one round trip covers many chunks
+EMBEDDING_BATCH_SIZE = 16
 
 class AzureOpenAIService:
     def __init__(self):
@@ -22,84 +32,295 @@ class AzureOpenAIService:
             api_version=settings.AZURE_OPENAI_API_VERSION,
         )
 
+        self.async_client = AsyncAzureOpenAI(
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+        )
+
         self.deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
+        self.batch_deployment_name = settings.AZURE_OPENAI_BATCH_DEPLOYMENT_NAME or self.deployment_name
+
+        # Limit calls before they reach the service rather than retrying 429s. Calls from worker threads and from the
+        # event loop each have their own concurrency limit, so neither waits by blocking the other's threads,
+        # and both spend from the same rate limit budget
+        self._semaphore = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+        self._async_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._rate_limiter = TokenBucket(rpm=settings.LLM_RPM, tpm=settings.LLM_TPM)
+
+    async def close(self):
+        await self.async_client.close()
+
+    @contextmanager
+    def _throttle(self, *texts: str):
+        """Hold a concurrency slot and wait for rate limit budget for a request with the given input text"""
+        with self._semaphore:
+            self._rate_limiter.acquire(sum(len(text) for text in texts) // CHARS_PER_TOKEN)
+            yield
+
+    @asynccontextmanager
+    async def _throttle_async(self, *texts: str):
+        """Async version of _throttle, waiting on the event loop rather than in a thread"""
+        async with self._async_semaphore:
+            await self._rate_limiter.acquire_async(sum(len(text) for text in texts) // CHARS_PER_TOKEN)
+            yield
+
+    @staticmethod
+    def _cache_options(prompt_cache_key: str | None) -> dict:
+        """
+        Request options that route calls sharing a prompt prefix to the same cache, so the static
+        system prompt is served from the prompt cache rather than processed again
+        """
+        return {"extra_body": {"prompt_cache_key": prompt_cache_key}} if prompt_cache_key else {}
+
+    @staticmethod
+    def _message_texts(messages: List[Dict[str, str]]) -> List[str]:
+        return [message.get("content") or "" for message in messages]
 
     def get_rfp_decision_log(
             self, 
             rfp_content: str
         ):
 
-        response = self.client.beta.chat.completions.parse(
-            model=self.deployment_name,
-            messages=[
-                {"role": "system", "content": RFP_INGESTION_SYSTEM_PROMPT},
-                {"role": "user", "content": rfp_content}
-            ],
-            response_format=DecisionLog
-        )
+        with self._throttle(RFP_INGESTION_SYSTEM_PROMPT, rfp_content):
+            response = self.client.beta.chat.completions.parse(
+                model=self.deployment_name,
+                messages=[
+                    {"role": "system", "content": RFP_INGESTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": rfp_content}
+                ],
+                response_format=DecisionLog
+            )
 
         message_content = response.choices[0].message.parsed
         return message_content
     
+    async def get_rfp_decision_log_async(self, rfp_content: str):
+        async with self._throttle_async(RFP_INGESTION_SYSTEM_PROMPT, rfp_content):
+            response = await self.async_client.beta.chat.completions.parse(
+                model=self.deployment_name,
+                messages=[
+                    {"role": "system", "content": RFP_INGESTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": rfp_content}
+                ],
+                response_format=DecisionLog
+            )
+
+        message_content = response.choices[0].message.parsed
+        return message_content
+
+    def create_rfp_decision_log_batch(self, rfp_content: str, custom_id: str) -> str:
+        """
+        Submit the decision log request as a Batch API job, which costs less than a direct call
+        but completes asynchronously. custom_id identifies the request in the job's output, such as the RFP ID.
+        Returns the batch ID to pass to get_rfp_decision_log_batch.
+        """
+        request = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": {
+                "model": self.batch_deployment_name,
+                "messages": [
+                    {"role": "system", "content": RFP_INGESTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": rfp_content}
+                ],
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {"name": "DecisionLog", "schema": DecisionLog.model_json_schema()}
+                }
+            }
+        }
+
+        batch_file = self.client.files.create(
+            file=("decision_log.jsonl", json.dumps(request).encode("utf-8")),
+            purpose="batch"
+        )
+
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/chat/completions",
+            completion_window="24h"
+        )
+
+        return batch.id
+
+    def get_rfp_decision_log_batch(self, batch_id: str) -> DecisionLog | None:
+        """
+        Get the decision log from a batch job, or None if the job has not finished yet.
+        Raises RuntimeError if the job or its request failed, expired or was cancelled, and ValueError
+        if the output is not a valid decision log.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+
+        # A cancelling job has not finished yet; the next poll sees it as cancelled
+        if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+            return None
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'")
+
+        # The job holds a single request; a request that failed is written to the error file instead
+        lines = self.client.files.content(batch.output_file_id).text.splitlines()
+        if not lines:
+            raise RuntimeError(f"Batch {batch_id} completed without output; see error file {batch.error_file_id}")
+
+        output = json.loads(lines[0])
+        response = output.get("response") or {}
+        if response.get("status_code") != 200:
+            raise RuntimeError(f"Request {output.get('custom_id')} in batch {batch_id} failed: {output.get('error') or response.get('body')}")
+
+        message_content = response["body"]["choices"][0]["message"]["content"]
+
+        return DecisionLog.model_validate_json(message_content)
+
     # This method is used to get a chat response from the Azure OpenAI service using the supplied response format for a structured output response
     def get_chat_response(
             self,
             messages: List[Dict[str, str]],
-            response_format: type
+            response_format: type,
+            prompt_cache_key: str | None = None
         ):
-        response = self.client.beta.chat.completions.parse(
-            model=self.deployment_name,
-            messages=messages,
-            response_format=response_format
-        )
+        with self._throttle(*self._message_texts(messages)):
+            response = self.client.beta.chat.completions.parse(
+                model=self.deployment_name,
+                messages=messages,
+                response_format=response_format,
+                **self._cache_options(prompt_cache_key)
+            )
 
         message_content = response.choices[0].message.parsed
         return message_content
     
-    def get_chat_response_text(self, messages: List[Dict[str, str]]) -> str:
+    async def get_chat_response_async(
+            self,
+            messages: List[Dict[str, str]],
+            response_format: type,
+            prompt_cache_key: str | None = None
+        ):
+        async with self._throttle_async(*self._message_texts(messages)):
+            response = await self.async_client.beta.chat.completions.parse(
+                model=self.deployment_name,
+                messages=messages,
+                response_format=response_format,
+                **self._cache_options(prompt_cache_key)
+            )
+
+        message_content = response.choices[0].message.parsed
+        return message_content
+
+    def get_chat_response_text(self, messages: List[Dict[str, str]], prompt_cache_key: str | None = None) -> str:
         """
         Gets a simple text response from Azure OpenAI (non-streaming, no structured output)
         """
-        response = self.client.chat.completions.create(
-            model=self.deployment_name,
-            messages=messages
-        )
+        with self._throttle(*self._message_texts(messages)):
+            response = self.client.chat.completions.create(
+                model=self.deployment_name,
+                messages=messages,
+                **self._cache_options(prompt_cache_key)
+            )
         
         message_content = response.choices[0].message.content
         
         return message_content
 
+    async def get_chat_response_text_async(self, messages: List[Dict[str, str]], prompt_cache_key: str | None = None) -> str:
+        async with self._throttle_async(*self._message_texts(messages)):
+            response = await self.async_client.chat.completions.create(
+                model=self.deployment_name,
+                messages=messages,
+                **self._cache_options(prompt_cache_key)
+            )
+
+        message_content = response.choices[0].message.content
+
+        return message_content
+
     def get_chat_response_stream(self, messages: List[Dict[str, str]]) -> Generator[str, None, None]:
         """
         Get streaming chat response from Azure OpenAI
         Yields content chunks as they arrive
         """
-        response = self.client.chat.completions.create(
-            model=self.deployment_name,
-            messages=messages,
-            stream=True
-        )
-        
-        for chunk in response:
-            #if chunk.choices[0].delta.content is not None:
-            #    yield chunk.choices[0].delta.content
-            # Check if chunk has choices and if the first choice has delta content
-            if (chunk.choices and 
-                len(chunk.choices) > 0 and 
-                chunk.choices[0].delta and 
-                chunk.choices[0].delta.content is not None):
-                yield chunk.choices[0].delta.content
+        # The concurrency slot only covers starting the request. A generator the caller abandons is not closed
+        # until it is garbage collected, so nothing is yielded while the slot is held
+        with self._throttle(*self._message_texts(messages)):
+            response = self.client.chat.completions.create(
+                model=self.deployment_name,
+                messages=messages,
+                stream=True
+            )
+            
+        try:
+            for chunk in response:
+                #if chunk.choices[0].delta.content is not None:
+                #    yield chunk.choices[0].delta.content
+                # Check if chunk has choices and if the first choice has delta content
+                if (chunk.choices and 
+                    len(chunk.choices) > 0 and 
+                    chunk.choices[0].delta and 
+                    chunk.choices[0].delta.content is not None):
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
                     
 
+    async def get_chat_response_stream_async(
+            self,
+            messages: List[Dict[str, str]],
+            prompt_cache_key: str | None = None
+        ) -> AsyncGenerator[str, None]:
+        """
+        Async version of get_chat_response_stream
+        """
+        # As in get_chat_response_stream, the concurrency slot only covers starting the request,
+        # since the stream is read at the pace of the client it is sent to
+        async with self._throttle_async(*self._message_texts(messages)):
+            response = await self.async_client.chat.completions.create(
+                model=self.deployment_name,
+                messages=messages,
+                stream=True,
+                **self._cache_options(prompt_cache_key)
+            )
+
+        try:
+            async for chunk in response:
+                if (chunk.choices and
+                    chunk.choices[0].delta and
+                    chunk.choices[0].delta.content is not None):
+                    yield chunk.choices[0].delta.content
+        finally:
+            await response.close()
+
     def create_embedding(
             self, 
             text: str
         ):
 
-        response = self.client.embeddings.create(
-            model=settings.AZURE_OPENAI_TEXT_EMBEDDING_DEPLOYMENT_NAME,
-            input=text
-        )
+        with self._throttle(text):
+            response = self.client.embeddings.create(
+                model=settings.AZURE_OPENAI_TEXT_EMBEDDING_DEPLOYMENT_NAME,
+                input=text
+            )
         
         embeddings = response.data[0].embedding
-        return embeddings
\ No newline at end of file
+        return embeddings
+
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts, sending up to EMBEDDING_BATCH_SIZE of them per request.
+        Embeddings are returned in the same order as the texts.
+        """
+        embeddings = []
+
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+
+            with self._throttle(*batch):
+                response = self.client.embeddings.create(
+                    model=settings.AZURE_OPENAI_TEXT_EMBEDDING_DEPLOYMENT_NAME,
+                    input=batch
+                )
+
+            embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+
+        return embeddings
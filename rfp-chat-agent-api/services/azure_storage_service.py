@@ -1,26 +1,30 @@
-from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
-from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobLeaseClient, BlobServiceClient, BlobSasPermissions, BlobType, StorageErrorCode, generate_blob_sas
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
 from core.settings import settings
+from typing import IO, Iterable
 import datetime
+import itertools
 import logging
 import re
 
 logger = logging.getLogger(__name__)
-logger.setLevel(settings.LOG_LEVEL)
 
-# Console handler (prints to terminal)
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+class HashingReader:
+    """
+    Read-only stream wrapper that feeds everything read through it to a hashlib hasher.
 
-# Formatter
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+    It has no seek or tell, so the SDK uploads it as a non-seekable stream, reading it once from start to end,
+    and the hash covers exactly the uploaded bytes.
+    """
+    def __init__(self, stream: IO[bytes], hasher):
+        self._stream = stream
+        self.hasher = hasher
 
-ch.setFormatter(formatter)
-
-# Add handler
-logger.addHandler(ch)
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.hasher.update(data)
+        return data
 
 class AzureStorageService:
     def __init__(self):
@@ -33,29 +37,56 @@ class AzureStorageService:
         self.blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
         self.container_client = self.blob_service_client.get_container_client(settings.AZURE_STORAGE_RFP_CONTAINER_NAME)
 
-    def upload_file_with_dup_check(
+    def upload_stream(
+        self,
+        folder_name: str,
+        stream: IO[bytes],
+        blob_name: str,
+        max_concurrency: int = 4
+    ) -> str:
+        """
+        Uploads a file-like object to Azure Blob Storage without reading it into memory first, replacing any blob
+        of the same name. Large streams are uploaded as blocks, up to max_concurrency at a time.
+
+        Args:
+            folder_name (str): Target virtual folder path inside the container.
+            stream (IO[bytes]): The content to upload, read from its current position.
+            blob_name (str): The target blob's name or relative path.
+            max_concurrency (int, optional): Maximum number of blocks uploaded in parallel.
+
+        Returns:
+            str: The path to the uploaded blob within the container.
+        """
+        # Normalize the blob path
+        blob_path = f"{folder_name.rstrip('/')}/{blob_name.lstrip('/')}"
+
+        blob_client = self.container_client.get_blob_client(blob_path)
+        blob_client.upload_blob(stream, overwrite=True, max_concurrency=max_concurrency)
+        return blob_path
+
+    def upload_file(
         self,
         folder_name: str,
         content: bytes | str,
         blob_name: str,
         metadata: dict | None = None
-    ) -> tuple[str,bool]:
+    ) -> str:
         """
         Uploads content to Azure Blob Storage, accepting either bytes or string input.
+        This method is specifically for updating the capabilities file.
 
         Args:
             folder_name (str): Target virtual folder path inside the container.
             content (bytes | str): The file content to upload; string will be encoded to UTF-8.
             blob_name (str): The target blob's name or relative path.
-            metadata (dict, optional): Metadata to set on the blob after upload.
+            metadata (dict, optional): Metadata to set on the blob.
 
         Returns:
             str: The path to the uploaded blob within the container.
-            bool: True if the upload was successful, False if the blob already exists.
         """
         # Normalize the blob path
         blob_path = f"{folder_name.rstrip('/')}/{blob_name.lstrip('/')}"
-    
+
         # Ensure content is bytes
         if isinstance(content, str):
             file_bytes = content.encode('utf-8')
@@ -64,38 +95,31 @@ class AzureStorageService:
 
         # Get a client and upload
         blob_client = self.container_client.get_blob_client(blob_path)
+        blob_client.upload_blob(
+            file_bytes,
+            overwrite=True,
+            metadata=self.stringify_metadata(metadata) if metadata else None
+        )
+        return blob_path
 
-        # Check if the blob already exists
-        if blob_client.exists():
-            logger.info(f"Blob '{blob_path}' already exists; Skipping upload.")
-            return blob_path, False
-        
-        blob_client.upload_blob(file_bytes, overwrite=False)
-
-        # Set metadata if provided
-        if metadata:
-            safe_metadata = self.stringify_metadata(metadata)
-            blob_client.set_blob_metadata(safe_metadata)
-
-        return blob_path, True
-
-    def upload_file(
+    def upload_file_if_unchanged(
         self,
         folder_name: str,
         content: bytes | str,
         blob_name: str,
-    ) -> str:
+        etag: str | None,
+    ) -> bool:
         """
-        Uploads content to Azure Blob Storage, accepting either bytes or string input.
-        This method is specifically for updating the capabilities file.
+        Uploads content only if the blob has not changed since it was read, for read-modify-write updates.
 
         Args:
             folder_name (str): Target virtual folder path inside the container.
             content (bytes | str): The file content to upload; string will be encoded to UTF-8.
             blob_name (str): The target blob's name or relative path.
+            etag (str | None): The ETag the blob had when it was read, or None if it did not exist.
 
         Returns:
-            str: The path to the uploaded blob within the container.
+            bool: True if the upload was successful, False if the blob was changed or created in the meantime.
         """
         # Normalize the blob path
         blob_path = f"{folder_name.rstrip('/')}/{blob_name.lstrip('/')}"
@@ -106,9 +130,77 @@ class AzureStorageService:
         else:
             file_bytes = content
 
-        # Get a client and upload
         blob_client = self.container_client.get_blob_client(blob_path)
-        blob_client.upload_blob(file_bytes, overwrite=True)
+
+        try:
+            if etag is None:
+                blob_client.upload_blob(file_bytes, overwrite=False)
+            else:
+                blob_client.upload_blob(file_bytes, overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified)
+        except (ResourceExistsError, ResourceModifiedError):
+            return False
+
+        return True
+
+    def append_text(
+        self,
+        folder_name: str,
+        content: bytes | str | Iterable[bytes | str],
+        blob_name: str,
+        separator: str = "",
+    ) -> str:
+        """
+        Appends content to an Append Blob, creating the blob if it does not exist.
+        Only the new content is sent, so the cost of an append does not grow with the size of the blob.
+
+        Args:
+            folder_name (str): Target virtual folder path inside the container.
+            content (bytes | str | Iterable): The content to append; strings will be encoded to UTF-8.
+                An iterable of pieces is streamed as it is consumed, so the combined content is never built in memory.
+            blob_name (str): The target blob's name or relative path.
+            separator (str, optional): Written before the content when the blob already has content.
+
+        Returns:
+            str: The path to the appended blob within the container.
+        """
+        # Normalize the blob path
+        blob_path = f"{folder_name.rstrip('/')}/{blob_name.lstrip('/')}"
+
+        if isinstance(content, (bytes, str)):
+            content = [content]
+
+        # Ensure content is bytes
+        pieces = (piece.encode('utf-8') if isinstance(piece, str) else piece for piece in content)
+
+        blob_client = self.container_client.get_blob_client(blob_path)
+
+        # The pieces can only be read once, so check the blob before starting the upload rather than retrying after a failure
+        try:
+            properties = blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            properties = None
+
+        if separator and properties and properties.size > 0:
+            pieces = itertools.chain([separator.encode('utf-8')], pieces)
+
+        if properties and properties.blob_type != BlobType.APPENDBLOB:
+            # Blobs written before appends were supported are Block Blobs; convert them once
+            logger.info(f"Converting '{blob_path}' to an Append Blob.")
+            existing = blob_client.download_blob().readall()
+            blob_client.upload_blob(itertools.chain([existing], pieces), blob_type=BlobType.APPENDBLOB, overwrite=True)
+            return blob_path
+
+        if properties is None:
+            # The SDK creates a missing Append Blob by rewinding the stream after the first append fails, which a
+            # generator cannot do, so create it up front; a concurrent writer may have created it in the meantime
+            try:
+                blob_client.create_append_blob(match_condition=MatchConditions.IfMissing)
+            except ResourceExistsError:
+                pass
+
+        # With overwrite=False an existing Append Blob is appended to rather than rejected
+        blob_client.upload_blob(pieces, blob_type=BlobType.APPENDBLOB, overwrite=False)
+
         return blob_path
 
     def generate_blob_sas_url(self, blob_name: str) -> str:
@@ -148,6 +240,42 @@ class AzureStorageService:
             blob_client = self.container_client.get_blob_client(blob.name)
             blob_client.set_blob_metadata(safe_metadata)
 
+    def list_blob_metadata(self, prefix: str) -> list[tuple[str, dict]]:
+        """
+        List the blobs under a prefix with their metadata.
+
+        Args:
+            prefix (str): The prefix path inside the container to list.
+
+        Returns:
+            list[tuple[str, dict]]: The path and metadata of each blob.
+        """
+        return [
+            (blob.name, blob.metadata or {})
+            for blob in self.container_client.list_blobs(name_starts_with=prefix, include=["metadata"])
+        ]
+
+    def acquire_lease(self, blob_path: str, lease_duration: int) -> BlobLeaseClient | None:
+        """
+        Lease a blob so only one client works on it, or return None if another client holds a lease on it.
+        Raises ResourceNotFoundError if the blob does not exist.
+        """
+        blob_client = self.container_client.get_blob_client(blob_path)
+
+        try:
+            return blob_client.acquire_lease(lease_duration=lease_duration)
+        except HttpResponseError as e:
+            if e.error_code == StorageErrorCode.LEASE_ALREADY_PRESENT:
+                return None
+            raise
+
+    def delete_blob(self, blob_path: str, lease: BlobLeaseClient | None = None) -> None:
+        """Delete a blob if it exists, passing the lease held on it if there is one."""
+        try:
+            self.container_client.delete_blob(blob_path, lease=lease)
+        except ResourceNotFoundError:
+            logger.debug("Blob '%s' was already deleted.", blob_path)
+
     @staticmethod
     def clean_ascii(input_str):
         # Remove all non-ASCII characters (keep only ASCII 0-127)
@@ -169,6 +297,17 @@ class AzureStorageService:
                 return part.split("=", 1)[1]
         raise ValueError("AccountKey not found in connection string.")
     
+    def get_blob_with_etag(self, blob_path: str) -> tuple[str, str | None]:
+        """Get the text of a blob and its ETag, or an empty string and None if it does not exist."""
+        blob_client = self.container_client.get_blob_client(blob_path)
+
+        try:
+            downloader = blob_client.download_blob()
+        except ResourceNotFoundError:
+            return "", None
+
+        return downloader.readall().decode("utf-8"), downloader.properties.etag
+
     def get_blob(self, blob_path: str) -> str:
         blob_client = self.container_client.get_blob_client(blob_path)
 
@@ -176,5 +315,5 @@ class AzureStorageService:
             data = blob_client.download_blob().readall()
             return data.decode("utf-8")
         except ResourceNotFoundError:
-            logger.error(f"{blob_path}' not found.")
+            logger.debug("Blob '%s' not found.", blob_path)
             return ""
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Client-side rate limiting for Azure OpenAI calls
+"""
+
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe limiter for requests per minute and tokens per minute, for threads and coroutines alike.
+
+    Both budgets refill continuously, so callers wait only as long as needed for enough budget
+    to be available instead of sending requests that would be rejected with a 429.
+    A limit of 0 disables that budget.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request and the given number of tokens fit in the budget, then spend them"""
+        while (wait := self._try_spend(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """Async version of acquire; waits without blocking the event loop and shares the budget with acquire"""
+        while (wait := self._try_spend(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def _try_spend(self, tokens: int) -> float:
+        """Spend one request and the given number of tokens if they fit, returning 0, or else the seconds to wait"""
+        # A request larger than the whole budget would never fit, so let it through once the budget is full
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+
+        with self._lock:
+            self._refill()
+
+            wait = 0.0
+            if self.rpm and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+            if self.tpm and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+
+            if wait == 0:
+                if self.rpm:
+                    self._requests -= 1
+                if self.tpm:
+                    self._tokens -= tokens
+
+            return wait
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
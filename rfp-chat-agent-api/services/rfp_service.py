@@ -1,50 +1,261 @@
-import json
-from typing import Dict, List, Optional
+import asyncio
+import bisect
+import hashlib
+import io
+import orjson
+from typing import AsyncGenerator, BinaryIO, Dict, List, Optional
 from fastapi import File, Form, UploadFile
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 from models.decision_log import DecisionLog
 from models.process_rfp_response import ProcessRfpResponse
 from services.azure_ai_search_service import SearchResult
+from services.azure_storage_service import HashingReader
 from pathlib import Path
 from models.rfp_conversation import RfpConversation, ConversationResult, ReviewDecision, SearchPromptResponse
 from core.settings import settings
+from core.tokenizer import get_enc
 import uuid
 import logging
-import tiktoken
-import time
+import re
 from services.service_registry import get_azure_openai_service
 from services.service_registry import get_azure_ai_search_service
 from services.service_registry import get_azure_storage_service
 from services.service_registry import get_azure_doc_intel_service
 from services.service_registry import get_chat_history_manager
 from models.chat_history import ChatMessage, Role
-from prompts.core_prompts import SEARCH_PROMPT
+from prompts.core_prompts import (
+    SEARCH_PROMPT,
+    SEARCH_REVIEW_PROMPT,
+    SEARCH_REVIEW_INPUT_TEMPLATE,
+    FINAL_ANSWER_PROMPT,
+    FINAL_ANSWER_INPUT_TEMPLATE,
+)
 
 logger = logging.getLogger(__name__)
-logger.setLevel(settings.LOG_LEVEL)
 
-# Console handler (prints to terminal)
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+MAX_ATTEMPTS = 3
+VETTED_SUMMARY_CHARS = 200
+NO_RESULTS_ANSWER = "I couldn't find relevant information in the RFP documents to answer your question. Please try rephrasing your question or check if the information exists in the uploaded documents."
 
-# Formatter
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Sidecar blob in each folder holding the hashes of what was already ingested: the extracted text of each file,
+# its paragraphs, and its bytes as lists of full hashes keyed by prehash
+INGEST_INDEX = ".ingest_index.json"
 
-ch.setFormatter(formatter)
+# Concurrent uploads to a folder each retry their index update on top of the other's, up to this many times
+INGEST_INDEX_UPDATE_ATTEMPTS = 5
 
-# Add handler
-logger.addHandler(ch)
+# Bytes hashed from each end of an upload to find likely duplicates without reading the whole file
+PREHASH_BYTES = 64 * 1024
 
-MAX_ATTEMPTS = 3
+# Boundaries chunk_text prefers to split on, from paragraphs down to words
+_SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+# Characters per token assumed by chunk_text before any text has been counted; refined from every window it counts
+CHARS_PER_TOKEN_ESTIMATE = 4.0
+
+# Chunks with fewer new tokens than this at the end of a document are merged into the previous chunk
+MIN_CHUNK_TOKENS = 100
+
+# Fields a supplied decision log may set when it is merged with the extracted one; other keys are ignored
+_DECISION_LOG_FIELDS = frozenset(DecisionLog.model_fields.keys())
+
+# Batch jobs take minutes to hours, so poll slowly and back off
+BATCH_POLL_INITIAL_SECONDS = 30
+BATCH_POLL_MAX_SECONDS = 600
+
+# Pending decision log batches are saved under this folder, one record per ingest, with the batch ID as blob metadata.
+# The folder is outside the pursuit folders, so storing a decision log as metadata on a pursuit leaves the records alone
+DECISION_LOG_BATCH_FOLDER = ".decision_log_batches"
+BATCH_ID_METADATA_KEY = "decision_log_batch_id"
+
+# Every app worker resumes every pending batch, so a worker leases a batch record before polling its batch.
+# 60 seconds is the longest lease that still expires on its own if the worker stops renewing it
+BATCH_LEASE_SECONDS = 60
+
+# Keep references to background tasks so they are not garbage collected before they finish
+_background_tasks = set()
+
+# The search index only needs to be created once per process
+_index_ready = False
+_index_lock = asyncio.Lock()
+
+def _page_text(content: str, page) -> str:
+    """Text of a page, taken from the document content so line breaks are preserved"""
+    spans = page.get('spans')
+    if spans:
+        return "".join(content[span['offset']:span['offset'] + span['length']] for span in spans)
+    return " ".join(w['content'] for w in page.get('words', []))
+
+_PARAGRAPH_BREAK = re.compile(r"(\n\s*\n)")
+
+def _dedup_paragraphs(text: str, seen: set[str]) -> str:
+    """
+    Drop paragraphs whose hash is already in seen, such as repeated headers, footers and boilerplate,
+    and add the hashes of the paragraphs that are kept
+    """
+    parts = _PARAGRAPH_BREAK.split(text)
+    kept = []
+
+    # parts alternates paragraph, break, paragraph, ...; a dropped paragraph takes its following break with it
+    for i in range(0, len(parts), 2):
+        paragraph = parts[i]
+        paragraph_break = parts[i + 1] if i + 1 < len(parts) else ""
+        key = paragraph.strip()
+
+        if key:
+            paragraph_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+            if paragraph_hash in seen:
+                continue
+            seen.add(paragraph_hash)
+
+        kept.append(paragraph + paragraph_break)
+
+    return "".join(kept)
+
+def _recursive_split(text: str, max_tokens: int, separators: List[str] = _SEPARATORS) -> List[tuple]:
+    """
+    Split text into (text, token count) pieces of at most max_tokens tokens, trying each separator in turn
+    and only recursing into pieces that are still too large. Separators are kept, so the pieces join back into text.
+
+    The text is encoded once, and each piece is measured by the tokens of the whole text that start inside it.
+    """
+    enc = get_enc()
+    _, token_starts = enc.decode_with_offsets(enc.encode(text))
+
+    pieces = []
+    _split_range(text, token_starts, 0, len(text), max_tokens, separators, pieces)
+    return pieces
+
+def _split_range(
+        text: str,
+        token_starts: List[int],
+        begin: int,
+        end: int,
+        max_tokens: int,
+        separators: List[str],
+        pieces: List[tuple]
+    ):
+    """Append the pieces of text[begin:end] to pieces; token_starts holds the character offset of each token of text"""
+    first_token = bisect.bisect_left(token_starts, begin)
+    end_token = bisect.bisect_left(token_starts, end)
+
+    if end_token - first_token <= max_tokens:
+        if begin < end:
+            pieces.append((text[begin:end], end_token - first_token))
+        return
+
+    if not separators:
+        # No boundary left to split on, so cut at token starts. Every token of a character encoded as several tokens
+        # starts at that character, so cutting before its first token never splits it
+        token = first_token
+        cut = begin
+        while end_token - token > max_tokens:
+            next_token = bisect.bisect_left(token_starts, token_starts[token + max_tokens])
+            if next_token <= token:
+                # A single character longer than max_tokens is kept whole
+                next_token = bisect.bisect_right(token_starts, token_starts[token + max_tokens])
+                if next_token >= end_token:
+                    break
+            pieces.append((text[cut:token_starts[next_token]], next_token - token))
+            token = next_token
+            cut = token_starts[token]
+        pieces.append((text[cut:end], end_token - token))
+        return
+
+    separator = separators[0]
+    position = begin
+    while position < end:
+        found = text.find(separator, position, end)
+        part_end = end if found == -1 else found + len(separator)
+        _split_range(text, token_starts, position, part_end, max_tokens, separators[1:], pieces)
+        position = part_end
+
+def _split_on_separators(text: str, max_chars: int, separators: List[str] = _SEPARATORS) -> List[str]:
+    """
+    Split text into pieces of about max_chars characters or fewer, trying each separator in turn and only recursing
+    into pieces that are still too long. Separators are kept, so the pieces join back into text.
+    Nothing is tokenized here; a piece with no separator left is kept whole and cut by tokens later if it has to be.
+    """
+    if len(text) <= max_chars or not separators:
+        return [text] if text else []
+
+    separator = separators[0]
+    pieces = []
+    position = 0
+    while position < len(text):
+        found = text.find(separator, position)
+        part_end = len(text) if found == -1 else found + len(separator)
+        pieces.extend(_split_on_separators(text[position:part_end], max_chars, separators[1:]))
+        position = part_end
+    return pieces
+
+class _TokenCounter:
+    """Counts the tokens of candidate windows and keeps a running characters-per-token ratio to size the next ones"""
+    def __init__(self):
+        self._enc = get_enc()
+        self._chars = 0
+        self._tokens = 0
+
+    def count(self, text: str) -> int:
+        n_tokens = len(self._enc.encode(text))
+        self._chars += len(text)
+        self._tokens += n_tokens
+        return n_tokens
+
+    def chars_for(self, n_tokens: int) -> int:
+        """Estimated number of characters in n_tokens tokens"""
+        chars_per_token = self._chars / self._tokens if self._tokens else CHARS_PER_TOKEN_ESTIMATE
+        return int(n_tokens * chars_per_token)
+
+def _join(pieces: List[tuple]) -> str:
+    return "".join(text for text, _ in pieces)
+
+def _overlap_pieces(chunk: List[tuple], max_tokens: int, counter: _TokenCounter) -> List[tuple]:
+    """
+    The trailing (text, page number) pieces of a chunk that fit in max_tokens tokens. Pieces are picked by their
+    estimated size and the pick is checked with a single count, dropping leading pieces until it fits.
+    A piece that does not fit whole is split further on the same boundaries, and its trailing parts that fit are used.
+    """
+    if max_tokens <= 0:
+        return []
+
+    remaining = counter.chars_for(max_tokens)
+    overlap = []
+
+    for text, page_number in reversed(chunk):
+        if remaining <= 0:
+            break
+
+        if len(text) > remaining:
+            for part in reversed(_split_on_separators(text, remaining)):
+                if len(part) > remaining:
+                    break
+                overlap.insert(0, (part, page_number))
+                remaining -= len(part)
+            break
+
+        overlap.insert(0, (text, page_number))
+        remaining -= len(text)
+
+    while overlap and counter.count(_join(overlap)) > max_tokens:
+        overlap.pop(0)
+
+    return overlap
 
 class RfpService:
     def __init__(self):
         if not all([
-            settings.PAGE_OVERLAP
+            settings.CHUNK_SIZE
         ]):
             raise ValueError("Required settings are missing")
 
+        # Reuse the shared service instances so their HTTP connection pools are kept alive across calls
+        self._storage = get_azure_storage_service()
+        self._doc = get_azure_doc_intel_service()
+        self._oai = get_azure_openai_service()
+        self._search = get_azure_ai_search_service()
+        self._history = get_chat_history_manager()
+
     async def process_rfp(
             self, 
             pursuit_name: str = Form(...),
@@ -68,111 +279,314 @@ class RfpService:
         # Parse decision log data if provided
         if data:
             try:
-                decision_log_data = json.loads(data)
+                decision_log_data = orjson.loads(data)
                 decision_log_dict = DecisionLog(**decision_log_data).model_dump(exclude_none=True)
             except Exception as e:
                 logger.error(f"Error validating decision log data: {e}")
                 raise ValueError("Invalid decision log data provided")
         
+        # Hashes of the bytes, text and paragraphs already ingested for this pursuit, so re-uploads are skipped
+        ingest_index = await asyncio.to_thread(self._load_ingest_index, pursuit_name)
+
+        results, new_content_hashes = await self._ingest_files(pursuit_name, files, ingest_index, save_text=True)
+
+        text_hashes = set(ingest_index["text"])
+        new_text_hashes = set()
+
         new_rfp_parts = []  # Store tuples of (allContent, filename)
-        
-        # Process each uploaded file
-        for file in files:
-            file_content = await file.read()
-            blob_path, uploaded = get_azure_storage_service().upload_file_with_dup_check(
-                pursuit_name,
-                file_content,
-                file.filename
-            )
 
-            if not uploaded:
-                logger.info(f"Blob '{blob_path}' already exists. Skipping processing.")
+        for allContent, file in zip(results, files):
+            # Skip files that were already uploaded
+            if allContent is None:
                 continue
 
-            logger.info(f"Uploaded '{blob_path}'.")
-
-            # Extract text from the uploaded file
-            sas_url = get_azure_storage_service().generate_blob_sas_url(blob_path)
-            logger.info(f"SAS URL: {sas_url}")
-            time.sleep(5)  # Sleep to ensure SAS URL is generated correctly
-            
-            allContent = get_azure_doc_intel_service().extract_text_from_url(sas_url)
-            content = allContent.content
-            logger.info(f"Extracted content: {content[:100]}...")
-
-            # Save extracted text as .txt file
-            p = Path(file.filename)
-            blob_name_with_txt = p.with_suffix(".txt").name
-            text_blob_path = get_azure_storage_service().upload_file(
-                pursuit_name,
-                content,
-                blob_name_with_txt
-            )
+            text_hash = self._hash_text(allContent.content)
+            if text_hash in text_hashes or text_hash in new_text_hashes:
+                logger.info(f"Text of '{file.filename}' was already ingested for pursuit {pursuit_name}. Skipping processing.")
+                continue
 
-            logger.info(f"Uploaded text content to '{text_blob_path}'.")
-            
-            # Add content with filename as tuple
+            new_text_hashes.add(text_hash)
             new_rfp_parts.append((allContent, file.filename))
 
         # Check if we have any NEW content to process
         if not new_rfp_parts:
             logger.info("No new RFP content to process. All files were duplicates or no files provided.")
+
+            # The text of these files is already ingested, so their bytes can be skipped on the next upload
+            await asyncio.to_thread(self._update_ingest_index, pursuit_name, content_hashes=new_content_hashes)
             
             return ProcessRfpResponse(
                 Pursuit_Name=pursuit_name,
                 Decision_Log=None
             )
 
-        new_content_only = "".join([allContent.content for allContent, filename in new_rfp_parts])
-        
-        # Update the combined RFP file with existing + new content
-        existing_rfp = get_azure_storage_service().get_blob(f"{pursuit_name}/{pursuit_name}.txt") or ""
-        final_rfp = existing_rfp + new_content_only
-        
-        final_blob_path = get_azure_storage_service().upload_file(
+        # Paragraphs already ingested for this pursuit, so repeated boilerplate is not sent to the LLM or indexed again.
+        # The LLM and chunking passes split pages differently, so each starts from its own copy of the set
+        paragraph_hashes = set(ingest_index["paragraphs"])
+
+        # Append only the new content to the combined RFP file instead of re-uploading all of it,
+        # streaming it file by file so the combined text is not also held in memory as bytes
+        final_blob_path = await asyncio.to_thread(
+            self._storage.append_text,
             pursuit_name,
-            final_rfp,
+            (allContent.content for allContent, filename in new_rfp_parts),
             pursuit_name + ".txt",
         )
         logger.info(f"Updated RFP uploaded to '{final_blob_path}'.")
 
+        # The decision log is extracted in a single LLM call, which needs the new text as one string
+        llm_seen = set(paragraph_hashes)
+        new_content_only = "".join(_dedup_paragraphs(allContent.content, llm_seen) for allContent, _ in new_rfp_parts)
+
         # Call LLM ONLY for NEW content
         logger.info(f"Calling LLM for NEW RFP content only with: {len(new_content_only)} characters.")
-        llm_response = get_azure_openai_service().get_rfp_decision_log(new_content_only)
-        logger.info(f"LLM response received for new content: {llm_response}")
+        if settings.LLM_MODE == "batch":
+            # The batch job completes in the background; the decision log is stored as metadata when it finishes
+            batch_id = await asyncio.to_thread(self._oai.create_rfp_decision_log_batch, new_content_only, rfp_id)
+            logger.info(f"Submitted decision log batch {batch_id} for pursuit: {pursuit_name}")
+            llm_response = None
+        else:
+            llm_response = await self._oai.get_rfp_decision_log_async(new_content_only)
+            logger.debug("LLM response received for new content: %s", llm_response)
 
         # Create search index
-        index_name = get_azure_ai_search_service().create_index()
-        logger.info(f"Index created: {index_name}")
-
-        # Index chunks for each file separately to maintain file name association
-        total_indexed = 0
-        for allContent, filename in new_rfp_parts:
-            chunks = self.chunk_text(allContent)
-            logger.info(f"Chunked file '{filename}' into {len(chunks)} parts.")
-            
-            indexing_result = get_azure_ai_search_service().index_rfp_chunks(
-                pursuit_name=pursuit_name,
-                rfp_id=rfp_id,
-                chunks=[chunk['chunked_text'] for chunk in chunks],
-                page_number= [chunk['pages'] for chunk in chunks],
-                file_name=filename
-            )
-            
-            total_indexed += len(indexing_result)
-            logger.info(f"Indexed {len(indexing_result)} chunks for file '{filename}' in pursuit: {pursuit_name}")
+        await self.ensure_index()
+
+        # Chunk the files in order first, since repeated paragraphs are dropped from later files using the shared seen set
+        chunk_seen = set(paragraph_hashes)
+        chunked_parts = await asyncio.to_thread(
+            lambda: [(self.chunk_text(allContent, chunk_seen), filename) for allContent, filename in new_rfp_parts]
+        )
+
+        # Index chunks for each file separately to maintain file name association, several files at a time
+        semaphore = asyncio.Semaphore(settings.INDEX_FILE_CONCURRENCY)
+
+        async def index_file(chunks: list, filename: str) -> int:
+            async with semaphore:
+                logger.info("Chunked file '%s' into %d parts.", filename, len(chunks))
+
+                indexing_result = await asyncio.to_thread(
+                    self._search.index_rfp_chunks,
+                    pursuit_name=pursuit_name,
+                    rfp_id=rfp_id,
+                    chunks=[chunk['chunked_text'] for chunk in chunks],
+                    page_number= [chunk['pages'] for chunk in chunks],
+                    file_name=filename,
+                    max_concurrency=settings.INDEX_CONCURRENCY
+                )
+
+                logger.info("Indexed %d chunks for file '%s' in pursuit: %s", len(indexing_result), filename, pursuit_name)
+                return len(indexing_result)
+
+        total_indexed = sum(await asyncio.gather(*[index_file(chunks, filename) for chunks, filename in chunked_parts]))
         
         logger.info(f"Total indexed {total_indexed} chunks across all files uploaded for Pursuit: {pursuit_name}")
 
+        # Record the new text only once it is indexed and its decision log is stored, so a failed ingest can be retried
+        ingested_hashes = {
+            "text_hashes": new_text_hashes,
+            "paragraph_hashes": chunk_seen - paragraph_hashes,
+            "content_hashes": new_content_hashes,
+        }
+
+        if llm_response is None:
+            # Persist the batch so its decision log is still stored, and its hashes recorded, if the app restarts first
+            record_path = await asyncio.to_thread(
+                self._save_decision_log_batch, pursuit_name, rfp_id, batch_id, decision_log_dict, ingested_hashes
+            )
+            self._start_decision_log_batch_poller(record_path, batch_id)
+
+            return ProcessRfpResponse(
+                Pursuit_Name=pursuit_name,
+                Decision_Log=None,
+                Status="pending"
+            )
+
+        final_decision_log = await asyncio.to_thread(self._store_decision_log, pursuit_name, rfp_id, llm_response, decision_log_dict)
+        await asyncio.to_thread(self._update_ingest_index, pursuit_name, **ingested_hashes)
+
+        # Create and return the response
+        process_rfp_response = ProcessRfpResponse(
+            Pursuit_Name=pursuit_name,
+            Decision_Log=final_decision_log
+        )
+
+        return process_rfp_response
+
+    def _save_decision_log_batch(
+            self,
+            pursuit_name: str,
+            rfp_id: str,
+            batch_id: str,
+            decision_log_dict: dict,
+            ingested_hashes: dict
+        ) -> str:
+        """
+        Save what is needed to finish an ingest once its decision log batch completes, with the batch ID as metadata.
+        Returns the path of the saved record.
+        """
+        record = {
+            "pursuit_name": pursuit_name,
+            "rfp_id": rfp_id,
+            "decision_log": decision_log_dict,
+            "text_hashes": sorted(ingested_hashes["text_hashes"]),
+            "paragraph_hashes": sorted(ingested_hashes["paragraph_hashes"]),
+            "content_hashes": ingested_hashes["content_hashes"],
+        }
+
+        return self._storage.upload_file(
+            f"{DECISION_LOG_BATCH_FOLDER}/{pursuit_name}",
+            orjson.dumps(record),
+            f"{rfp_id}.json",
+            metadata={BATCH_ID_METADATA_KEY: batch_id}
+        )
+
+    async def resume_decision_log_batches(self):
+        """Resume polling the decision log batches that were still pending when the app last stopped"""
+        try:
+            records = await asyncio.to_thread(self._storage.list_blob_metadata, f"{DECISION_LOG_BATCH_FOLDER}/")
+        except Exception as e:
+            logger.error(f"Error listing pending decision log batches: {e}")
+            return
+
+        for record_path, metadata in records:
+            batch_id = metadata.get(BATCH_ID_METADATA_KEY)
+            if batch_id:
+                logger.info(f"Resuming decision log batch {batch_id} from '{record_path}'.")
+                self._start_decision_log_batch_poller(record_path, batch_id)
+
+    def _start_decision_log_batch_poller(self, record_path: str, batch_id: str):
+        task = asyncio.create_task(self._complete_decision_log_batch(record_path, batch_id))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def _complete_decision_log_batch(self, record_path: str, batch_id: str):
+        """
+        Poll a decision log batch job with exponential backoff. Once it completes, store the decision log, record the
+        ingested hashes and delete the batch record. If the job fails, the chunks it indexed are deleted along with
+        the record, without recording the hashes, so the same content can be uploaded again from a clean slate.
+
+        Only the worker holding the lease on the batch record polls the batch; the others wait to take over
+        if it stops renewing the lease.
+        """
+        lease = await self._lease_decision_log_batch(record_path)
+        if lease is None:
+            return
+
+        renewal = asyncio.create_task(self._renew_lease(lease, record_path))
+
+        try:
+            await self._poll_decision_log_batch(record_path, batch_id, lease)
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+
+    async def _lease_decision_log_batch(self, record_path: str):
+        """Lease a batch record, waiting while another worker holds it, or return None once the record is gone"""
+        while True:
+            try:
+                lease = await asyncio.to_thread(self._storage.acquire_lease, record_path, BATCH_LEASE_SECONDS)
+            except ResourceNotFoundError:
+                return None
+            except Exception as e:
+                logger.warning(f"Error leasing decision log batch record '{record_path}': {e}")
+                lease = None
+
+            if lease is not None:
+                return lease
+
+            await asyncio.sleep(BATCH_LEASE_SECONDS)
+
+    @staticmethod
+    async def _renew_lease(lease, record_path: str):
+        while True:
+            await asyncio.sleep(BATCH_LEASE_SECONDS / 2)
+            try:
+                await asyncio.to_thread(lease.renew)
+            except Exception as e:
+                logger.warning(f"Error renewing the lease on '{record_path}': {e}")
+
+    async def _poll_decision_log_batch(self, record_path: str, batch_id: str, lease):
+        delay = BATCH_POLL_INITIAL_SECONDS
+
+        while True:
+            try:
+                llm_response = await asyncio.to_thread(self._oai.get_rfp_decision_log_batch, batch_id)
+            except (RuntimeError, ValueError) as e:
+                logger.error(f"Decision log batch {batch_id} failed: {e}")
+                await self._discard_decision_log_batch(record_path, batch_id, lease)
+                return
+            except Exception as e:
+                # Polling errors are transient; the job keeps running on the service
+                logger.warning(f"Error polling decision log batch {batch_id}: {e}")
+                llm_response = None
+
+            if llm_response is not None:
+                break
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BATCH_POLL_MAX_SECONDS)
+
+        logger.debug("LLM response received for batch %s: %s", batch_id, llm_response)
+
+        try:
+            record = orjson.loads(await asyncio.to_thread(self._storage.get_blob, record_path))
+            pursuit_name = record["pursuit_name"]
+
+            await asyncio.to_thread(self._store_decision_log, pursuit_name, record["rfp_id"], llm_response, record["decision_log"])
+            await asyncio.to_thread(
+                self._update_ingest_index,
+                pursuit_name,
+                text_hashes=set(record["text_hashes"]),
+                paragraph_hashes=set(record["paragraph_hashes"]),
+                content_hashes=[tuple(pair) for pair in record["content_hashes"]]
+            )
+            await asyncio.to_thread(self._storage.delete_blob, record_path, lease)
+        except Exception as e:
+            # The record is kept and its lease released, so another worker or the next startup stores the decision log
+            logger.error(f"Error storing the decision log from batch {batch_id}: {e}")
+            await self._release_lease(lease, record_path)
+
+    async def _discard_decision_log_batch(self, record_path: str, batch_id: str, lease):
+        """Delete the chunks indexed for a failed batch's ingest, then its record"""
+        try:
+            record = orjson.loads(await asyncio.to_thread(self._storage.get_blob, record_path))
+            deleted = await asyncio.to_thread(self._search.delete_rfp_chunks, record["rfp_id"])
+            logger.info(f"Deleted {deleted} chunks indexed for failed decision log batch {batch_id}.")
+
+            await asyncio.to_thread(self._storage.delete_blob, record_path, lease)
+        except Exception as e:
+            # The record is kept and its lease released, so the chunks are deleted when the batch is polled again
+            logger.error(f"Error discarding failed decision log batch {batch_id}: {e}")
+            await self._release_lease(lease, record_path)
+
+    @staticmethod
+    async def _release_lease(lease, record_path: str):
+        try:
+            await asyncio.to_thread(lease.release)
+        except Exception as e:
+            logger.warning(f"Error releasing the lease on '{record_path}': {e}")
+
+    def _store_decision_log(
+            self,
+            pursuit_name: str,
+            rfp_id: str,
+            llm_response: DecisionLog,
+            decision_log_dict: dict
+        ) -> Optional[DecisionLog]:
+        """Merge the LLM decision log with the supplied one, store it as metadata on the pursuit's blobs and return it"""
         # Prepare metadata for storage
         llm_response_dict = llm_response.model_dump()
         
-        # Merge decision log and LLM response (from NEW content only)
-        merged = {**llm_response_dict, **{k: v for k, v in decision_log_dict.items() if v not in (None, "")}}     
+        # Merge decision log and LLM response (from NEW content only), with supplied values taking precedence
+        merged = dict(llm_response_dict)
+        for k, v in decision_log_dict.items():
+            if v not in (None, "") and k in _DECISION_LOG_FIELDS:
+                merged[k] = v
         merged["Rfp_Id"] = rfp_id
 
         # Store metadata
-        get_azure_storage_service().add_metadata(
+        self._storage.add_metadata(
             folder=pursuit_name,
             metadata=merged
         )
@@ -180,11 +594,8 @@ class RfpService:
 
         # Validate and create final decision log
         try:
-            # Filter merged data to only include valid DecisionLog fields
-            valid_fields = set(DecisionLog.model_fields.keys())
-            filtered_data = {k: v for k, v in merged.items() if k in valid_fields}
-            
-            final_decision_log = DecisionLog.model_validate(filtered_data)
+            # Fields that are not part of DecisionLog, such as Rfp_Id, are ignored by validation
+            final_decision_log = DecisionLog.model_validate(merged)
             logger.info("Successfully validated DecisionLog model")
             
         except Exception as e:
@@ -194,103 +605,380 @@ class RfpService:
             final_decision_log = None
             logger.info("Set decision log to None due to validation error")
 
-        # Create and return the response
-        process_rfp_response = ProcessRfpResponse(
-            Pursuit_Name=pursuit_name,
-            Decision_Log=final_decision_log
+        return final_decision_log
+    
+    async def process_capabilities(self, files: list[UploadFile] = File(...)):
+        ingest_index = await asyncio.to_thread(self._load_ingest_index, "capabilities")
+        results, new_content_hashes = await self._ingest_files("capabilities", files, ingest_index, save_text=False)
+
+        new_parts = [extractedAll.content for extractedAll in results if extractedAll is not None]
+
+        if not new_parts:
+            logger.info("No new capabilities extracted from files.")
+            return
+
+        # Append only the new capabilities instead of downloading and re-uploading the whole file
+        blob_path = await asyncio.to_thread(
+            self._storage.append_text,
+            "capabilities",
+            "\n".join(filter(None, new_parts)),
+            "capabilities.txt",
+            separator="\n"
         )
 
-        return process_rfp_response
+        logger.info(f"Updated capabilities blob uploaded at '{blob_path}'.")
+
+        await asyncio.to_thread(self._update_ingest_index, "capabilities", content_hashes=new_content_hashes)
     
-    async def process_capabilities(self, files: list[UploadFile] = File(...)):
-        new_parts = []
-        existing_capabilities = get_azure_storage_service().get_blob("capabilities/capabilities.txt") or ""
-        logger.info(f"Loaded existing capabilities: {existing_capabilities[:100]}...")
+    async def ensure_index(self):
+        """Create the search index if it does not exist, checking at most once per process"""
+        global _index_ready
 
-        for file in files:
-            content_bytes = await file.read()
-            blob_path, uploaded= get_azure_storage_service().upload_file_with_dup_check("capabilities", content_bytes, file.filename)
+        if _index_ready:
+            return
 
-            if not uploaded:        
-                logger.info(f"Blob '{blob_path}' already exists. Notifying user.")
-                continue  # Skip to next file if already exists
+        async with _index_lock:
+            if not _index_ready:
+                index_name = await asyncio.to_thread(self._search.create_index)
+                logger.info(f"Index created: {index_name}")
+                _index_ready = True
+
+    async def _ingest_files(
+            self,
+            folder_name: str,
+            files: List[UploadFile],
+            ingest_index: dict,
+            save_text: bool
+        ) -> tuple[list, list[tuple[str, str]]]:
+        """
+        Upload the files, extract their text with Azure Document Intelligence and optionally save the text as .txt blobs.
 
-            logger.info(f"Uploaded raw file '{file.filename}' to blob storage.")
+        The work runs as a pipeline of three stages connected by queues, so the next file is uploaded while
+        earlier files are still being extracted and extracted text is saved while extraction continues:
+        one task uploads the files, OCR_WORKERS tasks extract text and TEXT_UPLOAD_WORKERS tasks save it.
 
-            sas_url = get_azure_storage_service().generate_blob_sas_url(f"capabilities/{file.filename}")
-            logger.info(f"SAS URL: {sas_url}")
-            time.sleep(5)  # wait for blob propagation (if needed)
+        Files whose bytes are in the folder's ingest_index, under any name, are skipped before they are uploaded.
+        Any other file is uploaded, replacing a blob of the same name.
 
-            extractedAll = get_azure_doc_intel_service().extract_text_from_url(sas_url)
-            extracted = extractedAll.content
+        A file that fails at any stage is logged and skipped, so one bad file does not fail the others.
 
-            logger.info(f"Extracted content (first 100 chars): {extracted[:100]}...")
-            new_parts.append(extracted)
+        Returns the analyze result for each file in upload order, or None for files that were already uploaded or failed,
+        and the (prehash, full hash) of the files that made it through every stage. The caller records these with
+        _update_ingest_index once it has finished with the files, so a file whose ingest fails later can be uploaded again.
+        """
+        results = [None] * len(files)
+        content_hashes = ingest_index["content"]
+        uploaded_hashes = {}  # index -> (prehash, full hash) of the files uploaded by this request
+        ocr_queue = asyncio.Queue()
+        text_queue = asyncio.Queue()
+        ocr_workers = settings.OCR_WORKERS
+        text_workers = settings.TEXT_UPLOAD_WORKERS if save_text else 0
+
+        def already_uploaded(prehash: str, full_hash: str) -> bool:
+            return full_hash in content_hashes.get(prehash, []) or (prehash, full_hash) in uploaded_hashes.values()
+
+        async def upload_stage():
+            for index, file in enumerate(files):
+                try:
+                    # Only files sharing a prehash with earlier content need a full hash before uploading;
+                    # for the rest the full hash is computed while the file is uploaded
+                    prehash = await asyncio.to_thread(self._prehash, file.file)
+                    if prehash in content_hashes or any(prehash == known for known, _ in uploaded_hashes.values()):
+                        full_hash = await asyncio.to_thread(self._full_hash, file.file)
+                        if already_uploaded(prehash, full_hash):
+                            logger.info(f"Content of '{file.filename}' was already uploaded to '{folder_name}'. Skipping processing.")
+                            continue
+
+                    sas_url, full_hash = await self._upload_for_extraction(folder_name, file)
+                except Exception as e:
+                    logger.error(f"Error uploading '{file.filename}': {e}")
+                    continue
+
+                uploaded_hashes[index] = (prehash, full_hash)
+                await ocr_queue.put((index, file, sas_url))
+
+            # One sentinel per worker tells the next stage there is nothing more to come
+            for _ in range(ocr_workers):
+                await ocr_queue.put(None)
+
+        async def ocr_stage():
+            while (item := await ocr_queue.get()) is not None:
+                index, file, sas_url = item
+
+                try:
+                    allContent = await self._extract_with_retry(sas_url)
+                except Exception as e:
+                    logger.error(f"Error extracting text from '{file.filename}': {e}")
+                    continue
+
+                logger.debug("Extracted content: %.100s...", allContent.content)
+
+                if save_text:
+                    await text_queue.put((index, file, allContent))
+                else:
+                    results[index] = allContent
+
+        async def text_stage():
+            while (item := await text_queue.get()) is not None:
+                index, file, allContent = item
+
+                # Save extracted text as .txt file
+                p = Path(file.filename)
+                blob_name_with_txt = p.with_suffix(".txt").name
+                try:
+                    text_blob_path = await asyncio.to_thread(
+                        self._storage.upload_file,
+                        folder_name,
+                        allContent.content,
+                        blob_name_with_txt
+                    )
+                except Exception as e:
+                    logger.error(f"Error uploading text content of '{file.filename}': {e}")
+                    continue
+
+                logger.info(f"Uploaded text content to '{text_blob_path}'.")
+                results[index] = allContent
+
+        upload_task = asyncio.create_task(upload_stage())
+        ocr_tasks = [asyncio.create_task(ocr_stage()) for _ in range(ocr_workers)]
+        text_tasks = [asyncio.create_task(text_stage()) for _ in range(text_workers)]
 
-        if not new_parts:
-            logger.info("No new capabilities extracted from files.")
-            return
+        try:
+            await asyncio.gather(upload_task, *ocr_tasks)
 
-        combined_text = "\n".join(filter(None, [existing_capabilities] + new_parts))
+            for _ in range(text_workers):
+                await text_queue.put(None)
 
-        blob_path = get_azure_storage_service().upload_file(
-            "capabilities",
-            combined_text,
-            "capabilities.txt"
+            await asyncio.gather(*text_tasks)
+        except BaseException:
+            # Stop the remaining stages so workers are not left waiting on their queues
+            for task in [upload_task, *ocr_tasks, *text_tasks]:
+                task.cancel()
+            raise
+
+        processed_hashes = [uploaded_hashes[index] for index in uploaded_hashes if results[index] is not None]
+
+        return results, processed_hashes
+
+    async def _upload_for_extraction(self, folder_name: str, file: UploadFile) -> tuple[str, str]:
+        """
+        Upload a file and return a SAS URL Document Intelligence can read it from, along with the sha256 of the uploaded bytes.
+
+        Whether a file still needs ingesting is decided by the content hashes in the ingest index, not by its name,
+        so a blob left behind by an ingest that failed part way is replaced rather than skipped.
+        """
+        # Stream the upload from its spooled temporary file rather than reading it all into memory,
+        # hashing it in the same pass
+        await file.seek(0)
+        hasher = hashlib.sha256()
+
+        # The blob client is synchronous, so run it in a thread to keep the event loop free
+        blob_path = await asyncio.to_thread(
+            self._storage.upload_stream,
+            folder_name,
+            HashingReader(file.file, hasher),
+            file.filename,
+            settings.BLOB_UPLOAD_CONCURRENCY
         )
 
-        logger.info(f"Updated capabilities blob uploaded at '{blob_path}'.")
-    
+        logger.info(f"Uploaded '{blob_path}'.")
+
+        sas_url = self._storage.generate_blob_sas_url(blob_path)
+        logger.debug("SAS URL: %s", sas_url)
+
+        return sas_url, hasher.hexdigest()
+
+    async def _extract_with_retry(self, sas_url: str, attempts: int = 5, base: float = 0.25):
+        """
+        Extract text from a freshly uploaded blob. The blob can briefly be unreadable through its SAS URL,
+        so only that failure is retried, with exponential backoff.
+        """
+        for attempt in range(attempts):
+            try:
+                return await self._doc.extract_text_from_url_async(sas_url)
+            except HttpResponseError as e:
+                blob_not_ready = e.status_code in (403, 404) or "ContentSourceNotAccessible" in str(e)
+                if not blob_not_ready or attempt == attempts - 1:
+                    raise
+
+                delay = base * 2 ** attempt
+                logger.info(f"Blob not readable yet, retrying text extraction in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
     @staticmethod
-    def chunk_text(allContent):
-        enc = tiktoken.get_encoding("o200k_base")
-        pages = allContent.pages
-        page_tokens = []
-        page_numbers = []
-
-        # Precompute tokens for each page
-        for page in pages:
-            page_text = " ".join(w['content'] for w in page.get('words', []))
-            tokens = enc.encode(page_text)
-            page_tokens.append(tokens)
-            page_numbers.append(page.get('pageNumber'))
+    def _hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-        chunks = []
-        
-        page_overlap_percent = float(settings.PAGE_OVERLAP) / 100
-
-        for idx, tokens in enumerate(page_tokens):
-
-            prev_tokens = []
-            if idx > 0:
-                prev = page_tokens[idx - 1]
-                prev_len = max(1, int(len(prev) * page_overlap_percent))
-                prev_tokens = prev[-prev_len:]
-
-            next_tokens = []
-            if idx < len(page_tokens) - 1:
-                nxt = page_tokens[idx + 1]
-                next_len = max(1, int(len(nxt) * page_overlap_percent))
-                next_tokens = nxt[:next_len]
-
-            combined_tokens = prev_tokens + tokens + next_tokens
-            combined_page_map = (
-                [page_numbers[idx - 1]] * len(prev_tokens) if idx > 0 else []
-            ) + [page_numbers[idx]] * len(tokens) + (
-                [page_numbers[idx + 1]] * len(next_tokens) if idx < len(page_tokens) - 1 else []
-            )
+    def _load_ingest_index(self, folder_name: str) -> dict:
+        """Load the folder's ingest index, or an empty one if nothing was ingested yet"""
+        data, _ = self._storage.get_blob_with_etag(f"{folder_name}/{INGEST_INDEX}")
+        return self._parse_ingest_index(data)
 
-            chunked_text = enc.decode(combined_tokens)
-            pages_in_chunk = sorted(set(p for p in combined_page_map if p is not None))
+    @staticmethod
+    def _parse_ingest_index(data: str) -> dict:
+        index = orjson.loads(data) if data else {}
+        return {
+            "text": index.get("text", []),
+            "paragraphs": index.get("paragraphs", []),
+            "content": index.get("content", {}),
+        }
+
+    def _update_ingest_index(
+            self,
+            folder_name: str,
+            text_hashes: set[str] = frozenset(),
+            paragraph_hashes: set[str] = frozenset(),
+            content_hashes: list[tuple[str, str]] = ()
+        ):
+        """
+        Add hashes to the folder's ingest index. The index is only written if it has not changed since it was read,
+        and is otherwise read again and the hashes added to the newer version, so concurrent uploads to the same
+        folder do not drop each other's hashes.
+        """
+        if not (text_hashes or paragraph_hashes or content_hashes):
+            return
 
-            chunks.append({
-                'chunk_tokens': combined_tokens,
-                'chunked_text': chunked_text,
-                'pages': pages_in_chunk,
-                'page_token_map': combined_page_map
-            })
+        for _ in range(INGEST_INDEX_UPDATE_ATTEMPTS):
+            data, etag = self._storage.get_blob_with_etag(f"{folder_name}/{INGEST_INDEX}")
+            index = self._parse_ingest_index(data)
+
+            index["text"] = sorted(set(index["text"]) | text_hashes)
+            index["paragraphs"] = sorted(set(index["paragraphs"]) | paragraph_hashes)
+            for prehash, full_hash in content_hashes:
+                known = index["content"].setdefault(prehash, [])
+                if full_hash not in known:
+                    known.append(full_hash)
+
+            if self._storage.upload_file_if_unchanged(folder_name, orjson.dumps(index), INGEST_INDEX, etag):
+                return
 
-        return chunks
+            logger.info(f"Ingest index for '{folder_name}' changed while it was being updated; retrying.")
+
+        raise RuntimeError(f"Could not update the ingest index for '{folder_name}' after {INGEST_INDEX_UPDATE_ATTEMPTS} attempts")
+
+    @staticmethod
+    def _prehash(stream: BinaryIO) -> str:
+        """
+        Hash the size, start and end of a stream, leaving it at its start.
+
+        The content index is keyed by this prehash, so only the few files sharing it are compared by full hash.
+        """
+        size = stream.seek(0, io.SEEK_END)
+        prehash = hashlib.sha256(str(size).encode("utf-8"))
+
+        stream.seek(0)
+        prehash.update(stream.read(PREHASH_BYTES))
+        if size > PREHASH_BYTES:
+            stream.seek(max(PREHASH_BYTES, size - PREHASH_BYTES))
+            prehash.update(stream.read(PREHASH_BYTES))
+
+        stream.seek(0)
+        return prehash.hexdigest()
+
+    @staticmethod
+    def _full_hash(stream: BinaryIO) -> str:
+        """sha256 of the whole stream, leaving it at its start"""
+        stream.seek(0)
+        full_hash = hashlib.file_digest(stream, "sha256").hexdigest()
+        stream.seek(0)
+        return full_hash
+
+    @staticmethod
+    def chunk_text(allContent, seen_paragraphs: Optional[set[str]] = None):
+        """
+        Split the document into chunks of up to CHUNK_SIZE tokens along paragraph, line, sentence and word
+        boundaries, in that order of preference. Each chunk starts with the end of the previous chunk
+        (CHUNK_OVERLAP percent of CHUNK_SIZE) and records the pages its text came from.
+
+        Chunk boundaries are first estimated from character counts, so only the candidate chunks are tokenized
+        rather than every page in full.
+
+        If seen_paragraphs is given, paragraphs whose hash is in it are left out and the hashes of the rest are added.
+        """
+        # Settings and the analyze result are descriptor-backed models, so read them once rather than per page or piece
+        chunk_size = settings.CHUNK_SIZE
+        overlap = int(chunk_size * settings.CHUNK_OVERLAP / 100)
+        content = allContent.content
+        counter = _TokenCounter()
+
+        # Pieces of about chunk_size tokens or fewer by the character estimate, as (text, page number) in document order
+        max_chars = counter.chars_for(chunk_size)
+        pieces = []
+        for page in allContent.pages:
+            page_text = _page_text(content, page)
+            if page_text and seen_paragraphs is not None:
+                page_text = _dedup_paragraphs(page_text, seen_paragraphs)
+            if page_text:
+                page_number = page.get('pageNumber')
+                pieces.extend((text, page_number) for text in _split_on_separators(page_text + "\n", max_chars))
+
+        chunks = []
+        carried_counts = []  # Number of pieces at the start of each chunk that repeat the previous chunk
+        current = []  # The overlap carried into the next chunk
+        start = 0
+
+        while start < len(pieces):
+            # Take the pieces the estimate says fit after the overlap, at least one, and count only that window.
+            # While it fits with room to spare, take more by the same estimate; once it does not, binary search for
+            # the most pieces that fit
+            fitting_end = start
+            end = start + 1
+            budget = counter.chars_for(chunk_size) - len(_join(current)) - len(pieces[start][0])
+            while True:
+                while end < len(pieces) and len(pieces[end][0]) <= budget:
+                    budget -= len(pieces[end][0])
+                    end += 1
+
+                n_tokens = counter.count(_join(current + pieces[start:end]))
+                if n_tokens > chunk_size:
+                    low, high = fitting_end, end - 1
+                    while low < high:
+                        middle = (low + high + 1) // 2
+                        if counter.count(_join(current + pieces[start:middle])) <= chunk_size:
+                            low = middle
+                        else:
+                            high = middle - 1
+                    end = low
+                    break
+
+                fitting_end = end
+                budget = counter.chars_for(chunk_size - n_tokens)
+                if end == len(pieces) or len(pieces[end][0]) > budget:
+                    break
+
+            if end == start:
+                # Not even the next piece fits: cut it by tokens if it is too large on its own, else shrink the overlap
+                text, page_number = pieces[start]
+                n_tokens = counter.count(text)
+                if n_tokens > chunk_size:
+                    parts = _recursive_split(text, chunk_size)
+                    if len(parts) > 1:
+                        pieces[start:start + 1] = [(part, page_number) for part, _ in parts]
+                        continue
+                elif current:
+                    shrunk = _overlap_pieces(current, chunk_size - n_tokens, counter)
+                    # Retry with the smaller overlap, or with none if it could not shrink
+                    current = shrunk if len(_join(shrunk)) < len(_join(current)) else []
+                    continue
+                # A single character longer than chunk_size is kept whole
+                end = start + 1
+
+            chunks.append(current + pieces[start:end])
+            carried_counts.append(len(current))
+            start = end
+            current = _overlap_pieces(chunks[-1], overlap, counter) if start < len(pieces) else []
+
+        # Fold a short remainder into the previous chunk rather than indexing a near-empty chunk
+        if len(chunks) > 1 and counter.count(_join(chunks[-1][carried_counts[-1]:])) < MIN_CHUNK_TOKENS:
+            chunks[-2].extend(chunks.pop()[carried_counts[-1]:])
+
+        return [
+            {
+                'chunked_text': _join(chunk),
+                'pages': sorted({page_number for _, page_number in chunk} - {None})
+            }
+            for chunk in chunks
+        ]
     
     async def chat_with_rfp(self, 
                             user_query: str, 
@@ -309,7 +997,8 @@ class RfpService:
                 pursuit_name=pursuit_name,
                 max_attempts=MAX_ATTEMPTS,
                 user_id=user_id,
-                session_id=session_id
+                session_id=session_id,
+                prompt_token_budget=settings.CHAT_PROMPT_TOKEN_BUDGET
             )
 
             # Execute conversation workflow
@@ -333,8 +1022,48 @@ class RfpService:
                 "search_queries": []
             }
     
+    async def chat_with_rfp_stream(self,
+                                   user_query: str,
+                                   pursuit_name: Optional[str] = None,
+                                   session_id: Optional[str] = None,
+                                   user_id: Optional[str] = None) -> AsyncGenerator[str, None]:
+        """Streaming version of chat_with_rfp, yielding the final answer as it is generated"""
+        try:
+            if not session_id:
+                session_id = str(uuid.uuid4())
+                logger.info(f"Generated new session ID: {session_id}")
+
+            # initialize conversation state
+            conversation = RfpConversation(
+                user_query=user_query,
+                pursuit_name=pursuit_name,
+                max_attempts=MAX_ATTEMPTS,
+                user_id=user_id,
+                session_id=session_id,
+                prompt_token_budget=settings.CHAT_PROMPT_TOKEN_BUDGET
+            )
+
+            await self.run_search_workflow(conversation)
+
+        except Exception as e:
+            logger.error(f"Chat workflow failed: {str(e)}")
+            yield "I encountered an error processing your question. Please try again."
+            return
+
+        async for chunk in self.generate_final_answer_stream(conversation):
+            yield chunk
+
     async def execute_conversation_workflow(self, conversation: RfpConversation) -> ConversationResult:
         """Executes the agentic rag workflow"""
+        await self.run_search_workflow(conversation)
+
+        # Generate final answer by synthesizing vetted results
+        final_answer = await self.generate_final_answer(conversation)
+
+        return conversation.to_result(final_answer)
+
+    async def run_search_workflow(self, conversation: RfpConversation):
+        """Search and review until the vetted results can answer the question or the attempts run out"""
         # continue if we have not exceeded max attempts and conversation is not finalized
 
         # Initialize chat message for user query
@@ -345,25 +1074,32 @@ class RfpService:
             message=conversation.user_query
         )
                 
-        get_chat_history_manager().add_message(chat_message)
+        await asyncio.to_thread(self._history.add_message, chat_message)
 
         while conversation.should_continue():
             # Generate and execute search
             search_query = await self.generate_search_query(conversation)
             await self.execute_search(search_query, conversation)
-            
+
             # Review results
+            vetted_before = len(conversation.vetted_results)
             await self.review_search_results(conversation)
+            conversation.record_progress(len(conversation.vetted_results) - vetted_before)
 
-        # Generate final answer by synthesizing vetted results
-        final_answer = await self.generate_final_answer(conversation)
+        if conversation.is_stalled():
+            logger.info(f"Stopping search after {conversation.attempts} attempts without new vetted results.")
+        elif conversation.is_over_budget():
+            logger.info(f"Stopping search after {conversation.attempts} attempts; review prompts used about {conversation.prompt_tokens} tokens.")
+
+    @staticmethod
+    def _prompt_cache_key(conversation: RfpConversation) -> str:
+        # Calls for the same pursuit share the most context after the static system prompt
+        return conversation.pursuit_name or "default"
 
-        return conversation.to_result(final_answer)
-    
     async def generate_search_query(self, conversation: RfpConversation) -> str:
         """Generate search query using the LLM based on the conversation history"""
 
-        logger.info(f"Generating search query for attempt {conversation.attempts + 1}")
+        logger.debug("Generating search query for attempt %d", conversation.attempts + 1)
 
         # Build context more clearly
         context_parts = [f"User Question: {conversation.user_query}"]
@@ -382,20 +1118,21 @@ class RfpService:
             {"role": "system", "content": SEARCH_PROMPT},
             {"role": "user", "content": context}
         ]
-                
+
         try:
-            response = get_azure_openai_service().get_chat_response(messages, SearchPromptResponse)
-            
+            response = await self._oai.get_chat_response_async(messages, SearchPromptResponse, self._prompt_cache_key(conversation))
+            search_query = response.search_query
+
             chat_message = ChatMessage(
                 user_id=conversation.user_id,
                 session_id=conversation.session_id,
                 role=Role.ASSISTANT,
-                message=response.search_query)
+                message=search_query)
             
-            get_chat_history_manager().add_message(chat_message)
+            await asyncio.to_thread(self._history.add_message, chat_message)
 
-            conversation.add_search_attempt(response.search_query)
-            return response.search_query
+            conversation.add_search_attempt(search_query)
+            return search_query
         except Exception as e:
             logger.error(f"Search query generation failed: {str(e)}")
             # Fallback to user query
@@ -404,7 +1141,8 @@ class RfpService:
     async def execute_search(self, query: str, conversation: RfpConversation):
         """Execute search with proper error handling"""
         try:
-            results = get_azure_ai_search_service().run_search(
+            results = await asyncio.to_thread(
+                self._search.run_search,
                 search_query=query,
                 processed_ids=conversation.processed_ids,
                 pursuit_name=conversation.pursuit_name
@@ -431,7 +1169,7 @@ class RfpService:
                 }
             })
             
-            logger.info(f"Search executed successfully: {len(results)} results found for query '{query}'")
+            logger.debug("Search executed successfully: %d results found for query '%s'", len(results), query)
 
         except Exception as e:
             logger.error(f"Search execution failed for query '{query}': {str(e)}")
@@ -443,44 +1181,46 @@ class RfpService:
         Uses Azure OpenAI to analyze relevance and make decisions about continuing or finalizing.
         """
 
-        logger.info(f"Reviewing search results.")
+        logger.debug("Reviewing search results.")
 
-        try:
-            from prompts.core_prompts import SEARCH_REVIEW_PROMPT
+        # Nothing to review, so skip the LLM call and let the next attempt search again
+        if not conversation.current_results:
+            logger.debug("No search results to review.")
+            conversation.reviews.append("No results returned from search.")
+            conversation.decisions.append("retry")
+            return
 
+        try:
             # Format current search results for review
             current_results_formatted = self.format_search_results_for_review(conversation.current_results)
             
-            # Format previously vetted results (don't review these again)
-            vetted_results_formatted = self.format_search_results_for_review(conversation.vetted_results)
+            # Format previously vetted results (don't review these again). The review only needs to know
+            # what is already covered, so they are summarized rather than resent in full on every attempt
+            vetted_results_formatted = self.format_search_results_for_review(conversation.vetted_results, summarize=True)
             
             # Format search history for context
             search_history_formatted = self.format_search_history_for_review(conversation)
             
             # Construct the review prompt with all context
-            llm_input = f"""
-                User Question: {conversation.user_query}
-
-                <Current Search Results to review>
-                {current_results_formatted}
-                <end current search results to review>
-
-                <previously vetted results, do not review>
-                {vetted_results_formatted}
-                <end previously vetted results, do not review>
-
-                <Previous Attempts>
-                {search_history_formatted}
-                <end Previous Attempts>
-                """
+            llm_input = SEARCH_REVIEW_INPUT_TEMPLATE.format_map({
+                "user_query": conversation.user_query,
+                "current_results": current_results_formatted,
+                "vetted_results": vetted_results_formatted,
+                "search_history": search_history_formatted,
+            })
             
             messages = [
                 {"role": "system", "content": SEARCH_REVIEW_PROMPT},
                 {"role": "user", "content": llm_input}
             ]
 
+            # The static system prompt is served from the prompt cache, so only the variable input counts toward the budget
+            conversation.prompt_tokens += len(get_enc().encode(llm_input))
+
             # Get review decision from Azure OpenAI
-            review_decision = get_azure_openai_service().get_chat_response(messages, ReviewDecision)
+            review_decision = await self._oai.get_chat_response_async(
+                messages, ReviewDecision, self._prompt_cache_key(conversation)
+            )
 
             conversation.thought_process.append({
                 "step": "review",
@@ -543,13 +1283,21 @@ class RfpService:
         except Exception as e:
             logger.error(f"Search results review failed: {str(e)}")
 
-    def format_search_results_for_review(self, results: List[SearchResult]) -> str:
-        """Format search results for the review prompt with clear structure"""
+    def format_search_results_for_review(self, results: List[SearchResult], summarize: bool = False) -> str:
+        """
+        Format search results for the review prompt with clear structure.
+        With summarize, each result is reduced to its ID, pursuit and the start of its content.
+        """
         if not results:
             return "No results available."
         
         output_parts = ["\n=== Search Results ==="]
         for i, result in enumerate(results, 0):
+            if summarize:
+                summary = " ".join(result.chunk_content[:VETTED_SUMMARY_CHARS].split())
+                output_parts.append(f"- Chunk ID: {result.chunk_id} | Pursuit: {result.pursuit_name} | {summary}...")
+                continue
+
             result_section = [
                 f"\nResult #{i}",
                 "=" * 80,
@@ -582,87 +1330,116 @@ class RfpService:
     async def generate_final_answer(self, conversation: RfpConversation) -> str:
         """Generate final answer using Azure OpenAI with proper error handling"""
         
-        logger.info(f"Generating final answer.")
+        logger.debug("Generating final answer.")
         
         try:
             if not conversation.vetted_results:
-                return "I couldn't find relevant information in the RFP documents to answer your question. Please try rephrasing your question or check if the information exists in the uploaded documents."
+                return NO_RESULTS_ANSWER
             
-            # Format vetted results in the same way as review node
-            vetted_results_formatted = "\n=== Vetted Results ===\n"
-            for i, result in enumerate(conversation.vetted_results, 0):
-                result_parts = [
-                    f"\nResult #{i}",
-                    "=" * 80,
-                    f"ID: {result.chunk_id}",
-                    f"Pursuit Name: {result.pursuit_name}",
-                    f"Source File: {result.source_file}",
-                    "\n<Start Content>",
-                    "-" * 80,
-                    result.chunk_content,
-                    "-" * 80,
-                    "<End Content>"
-                ]
-                vetted_results_formatted += "\n".join(result_parts)
-
-            final_prompt = """Create a comprehensive answer to the user's question using the vetted results."""
+            messages = await self._build_final_answer_messages(conversation)
             
-            llm_input = f"""Create a comprehensive answer to the user's question using the vetted results.
+            final_answer = await self._oai.get_chat_response_text_async(messages, self._prompt_cache_key(conversation))
+            
+            await self._record_final_answer(conversation, final_answer)
 
-                User Question: {conversation.user_query}
+            logger.debug("Sending final payload.")
+            
+            return final_answer
+            
+        except Exception as e:
+            logger.error(f"Final answer generation failed: {str(e)}")
+            return f"I encountered an error generating the final answer. Error: {str(e)}. Please try rephrasing your question."
 
-                Vetted Results:
-                {vetted_results_formatted}
+    async def generate_final_answer_stream(self, conversation: RfpConversation) -> AsyncGenerator[str, None]:
+        """Streaming version of generate_final_answer, yielding the answer as it is generated"""
 
-                Synthesize these results into a clear, complete answer. If there were no vetted results, say you couldn't find any relevant information to answer the question.
+        logger.debug("Streaming final answer.")
 
-                Guidance:
-                - Always use valid markdown syntax. Try to use level 1 or level 2 headers for your sections. 
-                - Cite your sources using the following format: some text <cit>pursuit name - chunk id</cit> , some more text <cit>pursuit name - chunk id> , etc.
-                - Only cite sources that are actually used in the answer."""
+        if not conversation.vetted_results:
+            yield NO_RESULTS_ANSWER
+            return
 
-            chat_history = get_chat_history_manager().get_history(conversation.session_id)
+        answer_parts = []
 
-            # New Messages
-            messages = [
-                {"role": "system", "content": final_prompt},
-                {"role": "user", "content": llm_input}
+        try:
+            messages = await self._build_final_answer_messages(conversation)
+
+            async for chunk in self._oai.get_chat_response_stream_async(messages, self._prompt_cache_key(conversation)):
+                answer_parts.append(chunk)
+                yield chunk
+
+        except Exception as e:
+            logger.error(f"Final answer generation failed: {str(e)}")
+            yield f"I encountered an error generating the final answer. Error: {str(e)}. Please try rephrasing your question."
+            return
+
+        await self._record_final_answer(conversation, "".join(answer_parts))
+        logger.debug("Sent final payload.")
+
+    async def _build_final_answer_messages(self, conversation: RfpConversation) -> List[Dict[str, str]]:
+        """Build the final answer messages from the vetted results and chat history, adding the new input to the history"""
+        # Format vetted results in the same way as review node
+        vetted_parts = ["\n=== Vetted Results ===\n"]
+        for i, result in enumerate(conversation.vetted_results, 0):
+            result_parts = [
+                f"\nResult #{i}",
+                "=" * 80,
+                f"ID: {result.chunk_id}",
+                f"Pursuit Name: {result.pursuit_name}",
+                f"Source File: {result.source_file}",
+                "\n<Start Content>",
+                "-" * 80,
+                result.chunk_content,
+                "-" * 80,
+                "<End Content>"
             ]
+            vetted_parts.extend(result_parts)
 
-            for msg in messages:
-                chat_message = ChatMessage(
-                    user_id=conversation.user_id,
-                    session_id=conversation.session_id,
-                    role=Role(msg["role"]),
-                    message=msg["content"]
-                )
-                get_chat_history_manager().add_message(chat_message)
+        vetted_results_formatted = "\n".join(vetted_parts)
 
-            for msg in chat_history:
-                messages.append({"role": msg.role, "content": msg.message})
-            
-            final_answer = get_azure_openai_service().get_chat_response_text(messages)
-            
+        # The static instructions live in FINAL_ANSWER_PROMPT so every request shares a cacheable prefix
+        llm_input = FINAL_ANSWER_INPUT_TEMPLATE.format_map({
+            "user_query": conversation.user_query,
+            "vetted_results": vetted_results_formatted,
+        })
+
+        chat_history = await asyncio.to_thread(self._history.get_history, conversation.session_id)
+
+        # New Messages
+        messages = [
+            {"role": "system", "content": FINAL_ANSWER_PROMPT},
+            {"role": "user", "content": llm_input}
+        ]
+
+        # The system prompt is static, so only the user input is stored in the chat history
+        for msg in messages[1:]:
             chat_message = ChatMessage(
                 user_id=conversation.user_id,
                 session_id=conversation.session_id,
-                role=Role.ASSISTANT,
-                message=final_answer
+                role=Role(msg["role"]),
+                message=msg["content"]
             )
+            await asyncio.to_thread(self._history.add_message, chat_message)
 
-            get_chat_history_manager().add_message(chat_message)
+        for msg in chat_history:
+            messages.append({"role": msg.role, "content": msg.message})
+        
+        return messages
 
-            conversation.thought_process.append({
-                "step": "response",
-                "details": {
-                    "final_answer": final_answer
-                }
-            })
+    async def _record_final_answer(self, conversation: RfpConversation, final_answer: str):
+        """Add the final answer to the chat history and the thought process"""
+        chat_message = ChatMessage(
+            user_id=conversation.user_id,
+            session_id=conversation.session_id,
+            role=Role.ASSISTANT,
+            message=final_answer
+        )
 
-            logger.info(f"Sending final payload.")
-            
-            return final_answer
-            
-        except Exception as e:
-            logger.error(f"Final answer generation failed: {str(e)}")
-            return f"I encountered an error generating the final answer. Error: {str(e)}. Please try rephrasing your question."
\ No newline at end of file
+        await asyncio.to_thread(self._history.add_message, chat_message)
+
+        conversation.thought_process.append({
+            "step": "response",
+            "details": {
+                "final_answer": final_answer
+            }
+        })
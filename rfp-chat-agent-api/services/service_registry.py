@@ -2,73 +2,75 @@
 Centralized singleton management for Azure services
 """
 
-from functools import lru_cache
 from services.azure_openai_service import AzureOpenAIService
 from services.azure_ai_search_service import AzureAISearchService
 from services.azure_storage_service import AzureStorageService
 from services.azure_doc_intel_service import AzureDocIntelService
 from services.chat_history_manager import ChatHistoryManager
 import logging
-from core.settings import settings
+import threading
 
 logger = logging.getLogger(__name__)
-logger.setLevel(settings.LOG_LEVEL)
 
-# Console handler (prints to terminal)
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+# Services are created at most once, even when several threads ask for one before it exists
+_instances = {}
+_instances_lock = threading.Lock()
 
-# Formatter
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+def _get_instance(service_class):
+    instance = _instances.get(service_class)
+    if instance is None:
+        with _instances_lock:
+            instance = _instances.get(service_class)
+            if instance is None:
+                logger.info(f"Creating new {service_class.__name__} singleton instance")
+                instance = _instances[service_class] = service_class()
+    return instance
 
-ch.setFormatter(formatter)
-
-# Add handler
-logger.addHandler(ch)
-
-@lru_cache(maxsize=1)
 def get_azure_openai_service():
     """
     Create and cache a single instance of AzureOpenAIService
     """
-    logger.info("Creating new AzureOpenAIService singleton instance")
-
-    return AzureOpenAIService()
+    return _get_instance(AzureOpenAIService)
 
-@lru_cache(maxsize=1)
 def get_azure_ai_search_service():
     """
     Create and cache a single instance of AzureAISearchService
     """
-    logger.info("Creating new AzureAISearchService singleton instance")
-    
-    return AzureAISearchService()
+    return _get_instance(AzureAISearchService)
 
-@lru_cache(maxsize=1)
 def get_azure_storage_service():
     """
     Create and cache a single instance of AzureStorageService
     """
-    logger.info("Creating new AzureStorageService singleton instance")
-    
-    return AzureStorageService()
+    return _get_instance(AzureStorageService)
 
-@lru_cache(maxsize=1)
 def get_azure_doc_intel_service():
     """
     Create and cache a single instance of AzureDocIntelService
     """
-    logger.info("Creating new AzureDocIntelService singleton instance")
-    
-    return AzureDocIntelService()
+    return _get_instance(AzureDocIntelService)
 
-@lru_cache(maxsize=1)
 def get_chat_history_manager():
     """
     Create and cache a single instance of ChatHistoryManager
     """
-    logger.info("Creating new ChatHistoryManager singleton instance")
-    
-    return ChatHistoryManager()
\ No newline at end of file
+    return _get_instance(ChatHistoryManager)
+
+def warmup_services():
+    """
+    Create every service up front, so the first requests do not pay for client construction
+    """
+    get_azure_openai_service()
+    get_azure_ai_search_service()
+    get_azure_storage_service()
+    get_azure_doc_intel_service()
+    get_chat_history_manager()
+
+async def close_services():
+    """
+    Close the async clients of the services that were created
+    """
+    for service_class in (AzureOpenAIService, AzureDocIntelService):
+        instance = _instances.get(service_class)
+        if instance is not None:
+            await instance.close()
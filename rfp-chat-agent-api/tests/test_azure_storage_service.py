@@ -0,0 +1,53 @@
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import BlobType
+
+from services.azure_storage_service import AzureStorageService
+
+class FakeAppendBlobClient:
+    """Behaves like the SDK for a non-seekable append: appending to a missing blob fails."""
+    def __init__(self):
+        self.data = None
+
+    def get_blob_properties(self):
+        if self.data is None:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        return type("Properties", (), {"size": len(self.data), "blob_type": BlobType.APPENDBLOB})()
+
+    def create_append_blob(self, **kwargs):
+        if self.data is not None:
+            raise ResourceExistsError("The specified blob already exists.")
+        self.data = b""
+
+    def upload_blob(self, data, blob_type, overwrite):
+        assert blob_type == BlobType.APPENDBLOB and not overwrite
+        if self.data is None:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        self.data += b"".join(data)
+
+class FakeContainerClient:
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blob_client(self, blob_path):
+        return self.blobs.setdefault(blob_path, FakeAppendBlobClient())
+
+def make_service():
+    service = AzureStorageService.__new__(AzureStorageService)
+    service.container_client = FakeContainerClient()
+    return service
+
+def test_append_text_creates_a_missing_blob():
+    service = make_service()
+
+    blob_path = service.append_text("pursuit", (piece for piece in ["first", " file"]), "pursuit.txt", separator="\n")
+
+    assert blob_path == "pursuit/pursuit.txt"
+    assert service.container_client.blobs[blob_path].data == b"first file"
+
+def test_append_text_appends_to_an_existing_blob_after_the_separator():
+    service = make_service()
+
+    service.append_text("pursuit", "first", "pursuit.txt", separator="\n")
+    service.append_text("pursuit", b"second", "pursuit.txt", separator="\n")
+
+    assert service.container_client.blobs["pursuit/pursuit.txt"].data == b"first\nsecond"
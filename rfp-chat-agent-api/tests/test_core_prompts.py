@@ -0,0 +1,17 @@
+import pytest
+
+from core.tokenizer import get_enc
+from prompts.core_prompts import (
+    FINAL_ANSWER_PROMPT,
+    PROMPT_CACHE_MIN_TOKENS,
+    SEARCH_PROMPT,
+    SEARCH_REVIEW_PROMPT,
+)
+
+@pytest.mark.parametrize(
+    "prompt",
+    [SEARCH_PROMPT, SEARCH_REVIEW_PROMPT, FINAL_ANSWER_PROMPT],
+    ids=["SEARCH_PROMPT", "SEARCH_REVIEW_PROMPT", "FINAL_ANSWER_PROMPT"],
+)
+def test_chat_system_prompts_are_long_enough_for_the_prompt_cache(prompt):
+    assert len(get_enc().encode(prompt)) >= PROMPT_CACHE_MIN_TOKENS
@@ -0,0 +1,35 @@
+from core.settings import settings
+from core.tokenizer import get_enc
+from services.rfp_service import RfpService
+
+class AnalyzeResult:
+    def __init__(self, page_texts):
+        self.content = ""
+        self.pages = []
+        for page_number, text in enumerate(page_texts, start=1):
+            self.pages.append({'pageNumber': page_number, 'spans': [{'offset': len(self.content), 'length': len(text)}]})
+            self.content += text + "\n"
+
+def test_chunk_text_keeps_chunks_within_chunk_size_and_covers_every_page():
+    paragraph = "The vendor shall deliver the services described in section {} by the agreed date. "
+    page_texts = [
+        "\n\n".join(paragraph.format(f"{page}.{i}") * (i % 7 + 1) for i in range(20))
+        for page in range(1, 6)
+    ]
+    # A page without any separator has to be cut by tokens
+    page_texts.append("".join(str(i) for i in range(5000)))
+
+    chunks = RfpService.chunk_text(AnalyzeResult(page_texts))
+
+    enc = get_enc()
+    assert all(len(enc.encode(chunk['chunked_text'])) <= settings.CHUNK_SIZE for chunk in chunks)
+    assert sorted({page for chunk in chunks for page in chunk['pages']}) == [1, 2, 3, 4, 5, 6]
+
+    # Chunks follow each other through the document, each starting inside the previous one
+    content = "".join(text + "\n" for text in page_texts)
+    covered = 0
+    for chunk in chunks:
+        position = content.find(chunk['chunked_text'], 0, covered + len(chunk['chunked_text']))
+        assert 0 <= position <= covered
+        covered = max(covered, position + len(chunk['chunked_text']))
+    assert covered == len(content)